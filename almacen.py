@@ -0,0 +1,212 @@
+import threading
+import time
+
+from obra import DetalleObra, TablaObras
+from indice import conectar, en_lotes
+
+
+#Valores que DetalleObra.from_json usa cuando la API no informa el dato
+VALORES_POR_DEFECTO = {"Sin título", "Desconocido", "Desconocida", "N/D"}
+
+
+class AlmacenObras:
+    """
+    Espejo local de la colección en SQLite. Guarda los detalles de cada obra
+    descargada por la cosecha y recuerda qué departamentos están completos.
+    """
+
+    COLUMNAS = (
+        "id", "titulo", "artista", "nacionalidad", "nacimiento", "muerte",
+        "clasificacion", "anio_creacion", "url_imagen", "departamento", "actualizado",
+        "url_imagen_small"
+    )
+
+    def __init__(self, ruta="metroart.db"):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion = conectar(ruta)
+        self._conexion.executescript(
+            "CREATE TABLE IF NOT EXISTS obras ("
+            " id INTEGER PRIMARY KEY, titulo TEXT, artista TEXT, nacionalidad TEXT,"
+            " nacimiento TEXT, muerte TEXT, clasificacion TEXT, anio_creacion TEXT,"
+            " url_imagen TEXT, departamento TEXT, actualizado REAL, url_imagen_small TEXT);"
+            "CREATE TABLE IF NOT EXISTS departamento_obras ("
+            " departamento_id INTEGER, obra_id INTEGER,"
+            " PRIMARY KEY (departamento_id, obra_id));"
+            "CREATE INDEX IF NOT EXISTS idx_departamento_obras_obra ON departamento_obras(obra_id);"
+            "CREATE TABLE IF NOT EXISTS cosechas ("
+            " departamento_id INTEGER PRIMARY KEY, total INTEGER, completa INTEGER,"
+            " actualizado REAL);"
+            "CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);"
+        )
+        self._conexion.commit()
+
+    def guardar(self, datos, departamento_id=None):
+        #Guarda (o reemplaza) las obras a partir del JSON de la API
+        ahora = time.time()
+        filas = []
+        for data in datos:
+            detalle = DetalleObra.from_json(data)
+            filas.append((
+                int(detalle.id), detalle.titulo, detalle.artista, detalle.nacionalidad,
+                str(detalle.nacimiento), str(detalle.muerte), detalle.clasificacion,
+                str(detalle.anio_creacion), detalle.url_imagen,
+                data.get("department") or "", ahora, detalle.url_imagen_small
+            ))
+        with self._lock:
+            self._conexion.executemany(
+                f"INSERT OR REPLACE INTO obras ({', '.join(self.COLUMNAS)}) "
+                f"VALUES ({', '.join('?' * len(self.COLUMNAS))})",
+                filas
+            )
+            if departamento_id is not None:
+                #Una obra que cambió de departamento no debe seguir listada en el anterior
+                self._conexion.executemany(
+                    "DELETE FROM departamento_obras WHERE obra_id = ?",
+                    [(fila[0],) for fila in filas]
+                )
+                self._conexion.executemany(
+                    "INSERT OR IGNORE INTO departamento_obras VALUES (?, ?)",
+                    [(departamento_id, fila[0]) for fila in filas]
+                )
+            self._conexion.commit()
+
+    def ids_guardados(self, ids):
+        #Retorna el subconjunto de `ids` que ya está en el almacén
+        encontrados = set()
+        with self._lock:
+            for lote in en_lotes(ids):
+                filas = self._conexion.execute(
+                    f"SELECT id FROM obras WHERE id IN ({', '.join('?' * len(lote))})", lote
+                )
+                encontrados.update(fila[0] for fila in filas)
+        return encontrados
+
+    def ids(self):
+        #Retorna todos los IDs guardados
+        with self._lock:
+            return [fila[0] for fila in self._conexion.execute("SELECT id FROM obras")]
+
+    def eliminar(self, ids):
+        #Borra obras (y sus vínculos con departamentos) del almacén
+        filas = [(int(obj_id),) for obj_id in ids]
+        with self._lock:
+            self._conexion.executemany("DELETE FROM obras WHERE id = ?", filas)
+            self._conexion.executemany("DELETE FROM departamento_obras WHERE obra_id = ?", filas)
+            self._conexion.commit()
+
+    def obtener_meta(self, clave, por_defecto=None):
+        with self._lock:
+            fila = self._conexion.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else por_defecto
+
+    def guardar_meta(self, clave, valor):
+        with self._lock:
+            self._conexion.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (clave, str(valor)))
+            self._conexion.commit()
+
+    def vincular_departamento(self, departamento_id, ids):
+        #Asocia obras ya guardadas a un departamento
+        with self._lock:
+            self._conexion.executemany(
+                "INSERT OR IGNORE INTO departamento_obras VALUES (?, ?)",
+                [(departamento_id, int(obj_id)) for obj_id in ids]
+            )
+            self._conexion.commit()
+
+    def marcar_cosecha(self, departamento_id, total, completa):
+        #Registra el avance de la cosecha (departamento_id 0 = colección completa)
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO cosechas VALUES (?, ?, ?, ?)",
+                (departamento_id or 0, total, int(completa), time.time())
+            )
+            self._conexion.commit()
+
+    def departamento_completo(self, departamento_id):
+        #Indica si el departamento (o la colección entera) ya fue cosechado
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT MAX(completa) FROM cosechas WHERE departamento_id IN (?, 0)",
+                (departamento_id,)
+            ).fetchone()
+        return bool(fila and fila[0])
+
+    def obras_de_departamento(self, departamento_id):
+        #Retorna una TablaObras con las obras de un departamento, ordenadas por ID
+        return self._tabla(
+            "SELECT o.id, o.titulo, o.artista, o.nacionalidad FROM obras o "
+            "JOIN departamento_obras d ON d.obra_id = o.id "
+            "WHERE d.departamento_id = ? ORDER BY o.id",
+            (departamento_id,)
+        )
+
+    def _tabla(self, consulta, parametros=()):
+        tabla = TablaObras()
+        with self._lock:
+            for fila in self._conexion.execute(consulta, parametros):
+                tabla.agregar(*fila)
+        return tabla
+
+    def obtener_detalle(self, obj_id):
+        #Retorna el DetalleObra guardado o None
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT id, titulo, artista, nacionalidad, nacimiento, muerte, "
+                "clasificacion, anio_creacion, url_imagen, url_imagen_small "
+                "FROM obras WHERE id = ?",
+                (int(obj_id),)
+            ).fetchone()
+        return DetalleObra(*fila) if fila else None
+
+    def fusionar(self, ruta):
+        """
+        Copia al almacén las obras (y sus vínculos con departamentos) de otro
+        archivo de almacén, como los que escribe cada proceso de la cosecha
+        en paralelo. Retorna los IDs copiados.
+        """
+        columnas = ", ".join(self.COLUMNAS)
+        with self._lock:
+            self._conexion.execute("ATTACH DATABASE ? AS parte", (ruta,))
+            try:
+                ids = [fila[0] for fila in self._conexion.execute("SELECT id FROM parte.obras")]
+                self._conexion.execute(
+                    f"INSERT OR REPLACE INTO obras ({columnas}) SELECT {columnas} FROM parte.obras"
+                )
+                self._conexion.execute(
+                    "DELETE FROM departamento_obras "
+                    "WHERE obra_id IN (SELECT obra_id FROM parte.departamento_obras)"
+                )
+                self._conexion.execute(
+                    "INSERT OR IGNORE INTO departamento_obras "
+                    "SELECT departamento_id, obra_id FROM parte.departamento_obras"
+                )
+                self._conexion.commit()
+            finally:
+                self._conexion.execute("DETACH DATABASE parte")
+        return ids
+
+    def datos_indexables(self, ids):
+        """
+        Retorna, con las claves del JSON de la API, los campos de las obras
+        guardadas que usan los índices locales. Los valores por defecto de
+        DetalleObra ("Desconocido", "N/D"...) se devuelven vacíos.
+        """
+        datos = []
+        with self._lock:
+            for lote in en_lotes(ids):
+                filas = self._conexion.execute(
+                    "SELECT id, titulo, artista, nacionalidad, departamento, clasificacion "
+                    f"FROM obras WHERE id IN ({', '.join('?' * len(lote))})", lote
+                )
+                for fila in filas:
+                    valores = ["" if v in VALORES_POR_DEFECTO else v for v in fila[1:]]
+                    datos.append(dict(zip(
+                        ("title", "artistDisplayName", "artistNationality", "department", "classification"),
+                        valores
+                    ), objectID=fila[0]))
+        return datos
+
+    def __len__(self):
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM obras").fetchone()[0]
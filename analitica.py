@@ -0,0 +1,202 @@
+import re
+import threading
+from collections import Counter
+
+from indice import normalizar, conectar
+from almacen import VALORES_POR_DEFECTO
+
+
+#Agrupaciones disponibles, en el orden de las columnas de analitica_obras
+DIMENSIONES = ("departamento", "nacionalidad", "clasificacion",
+               "decada_creacion", "decada_nacimiento", "decada_muerte")
+
+#Valores que el espejo guarda cuando la API no informa el dato
+SIN_DATO = VALORES_POR_DEFECTO | {""}
+
+
+def decada(texto):
+    """
+    Extrae la década de un texto de fecha de la API: "ca. 1665–67" -> 1660,
+    "1880s" -> 1880, "late 19th century" -> 1800, "1st century B.C." -> -100.
+    Retorna None si el texto no contiene un año (o solo el 9999 de la API).
+    """
+    texto = normalizar(texto)
+    antes_de_cristo = re.search(r"\b(b\.\s?c\.?|bce|bc)(\W|$)", texto) is not None
+    siglo = re.search(r"\b(\d{1,2})(?:st|nd|rd|th) (?:century|c\.)", texto)
+    if siglo:
+        #Primera década del siglo (contando hacia atrás si es a. C.)
+        anio = int(siglo.group(1)) * 100 if antes_de_cristo else (int(siglo.group(1)) - 1) * 100
+    else:
+        numero = re.search(r"\b(\d{3,4})s?\b", texto)
+        if not numero:
+            return None
+        anio = int(numero.group(1))
+        #La API usa 9999 cuando no hay fecha (por ejemplo, artistas vivos)
+        if anio == 9999:
+            return None
+    if antes_de_cristo:
+        return -(anio // 10 * 10)
+    return anio // 10 * 10
+
+
+class AnaliticaColeccion:
+    """
+    Conteos de las obras del espejo local por departamento, nacionalidad,
+    clasificación y década (de creación, de nacimiento y de muerte del
+    artista). Cada obra se resume una vez en la tabla analitica_obras y los
+    conteos, guardados en analitica_conteos, se corrigen sumando y restando
+    solo las obras que cambiaron desde la última actualización.
+    """
+
+    def __init__(self, almacen, canonizar=None):
+        #canonizar(texto) -> lista de nacionalidades, como IndiceNacionalidades.canonizar
+        self._canonizar = canonizar
+        self._ruta = almacen.ruta
+        self._lock = threading.Lock()
+        #Las tablas se crean y los conteos se leen recién al primer uso
+        self._conexion = None
+        self._conteos = None
+
+    def _abrir(self):
+        if self._conexion is not None:
+            return
+        self._conexion = conectar(self._ruta)
+        self._conexion.executescript(
+            "CREATE TABLE IF NOT EXISTS analitica_obras ("
+            " id INTEGER PRIMARY KEY, departamento TEXT, nacionalidad TEXT, clasificacion TEXT,"
+            " decada_creacion TEXT, decada_nacimiento TEXT, decada_muerte TEXT);"
+            "CREATE TABLE IF NOT EXISTS analitica_conteos ("
+            " dimension TEXT, valor TEXT, cantidad INTEGER, PRIMARY KEY (dimension, valor));"
+            "CREATE INDEX IF NOT EXISTS idx_obras_actualizado ON obras(actualizado);"
+        )
+        self._conexion.commit()
+        self._conteos = {dimension: Counter() for dimension in DIMENSIONES}
+        for dimension, valor, cantidad in self._conexion.execute(
+                "SELECT dimension, valor, cantidad FROM analitica_conteos"):
+            if dimension in self._conteos:
+                self._conteos[dimension][valor] = cantidad
+
+    def _resumir(self, departamento, nacionalidad, clasificacion, anio_creacion, nacimiento, muerte):
+        #Valores de cada dimensión para una fila de la tabla obras
+        if self._canonizar is not None and nacionalidad not in SIN_DATO:
+            nacionalidad = "|".join(self._canonizar(nacionalidad))
+        decadas = [decada(texto) if texto not in SIN_DATO else None
+                   for texto in (anio_creacion, nacimiento, muerte)]
+        return (departamento or "", nacionalidad or "", clasificacion or "",
+                *("" if d is None else str(d) for d in decadas))
+
+    def _contar(self, resumen, signo, tocados):
+        for dimension, valor in zip(DIMENSIONES, resumen):
+            for parte in (valor.split("|") if dimension == "nacionalidad" else (valor,)):
+                if parte not in SIN_DATO:
+                    self._conteos[dimension][parte] += signo
+                    tocados.add((dimension, parte))
+
+    def _procesar(self, consulta, parametros, tocados, tamano_lote=1000):
+        #Resume las filas de obras de la consulta, descontando su resumen anterior
+        cursor = self._conexion.execute(consulta, parametros)
+        procesadas = 0
+        while True:
+            filas = cursor.fetchmany(tamano_lote)
+            if not filas:
+                break
+            ids = [fila[0] for fila in filas]
+            anteriores = {
+                fila[0]: fila[1:] for fila in self._conexion.execute(
+                    f"SELECT * FROM analitica_obras WHERE id IN ({', '.join('?' * len(ids))})", ids
+                )
+            }
+            nuevos = []
+            for obj_id, *campos, _ in filas:
+                resumen = self._resumir(*campos)
+                anterior = anteriores.get(obj_id)
+                if anterior == resumen:
+                    continue
+                if anterior is not None:
+                    self._contar(anterior, -1, tocados)
+                self._contar(resumen, 1, tocados)
+                nuevos.append((obj_id, *resumen))
+            self._conexion.executemany(
+                f"INSERT OR REPLACE INTO analitica_obras VALUES ({', '.join('?' * (len(DIMENSIONES) + 1))})",
+                nuevos
+            )
+            procesadas += len(nuevos)
+        return procesadas
+
+    def _contar_filas(self):
+        obras = self._conexion.execute("SELECT COUNT(*) FROM obras").fetchone()[0]
+        resumidas = self._conexion.execute("SELECT COUNT(*) FROM analitica_obras").fetchone()[0]
+        return obras, resumidas
+
+    def actualizar(self):
+        """
+        Incorpora las obras guardadas, modificadas o borradas del espejo
+        desde la última llamada. Retorna cuántas obras cambiaron los conteos.
+        """
+        columnas = "id, departamento, nacionalidad, clasificacion, anio_creacion, nacimiento, muerte, actualizado"
+        with self._lock:
+            self._abrir()
+            fila = self._conexion.execute(
+                "SELECT valor FROM meta WHERE clave = 'analitica_marca'"
+            ).fetchone()
+            marca = float(fila[0]) if fila else 0.0
+            nueva_marca = self._conexion.execute("SELECT MAX(actualizado) FROM obras").fetchone()[0]
+            tocados = set()
+            cambios = self._procesar(
+                f"SELECT {columnas} FROM obras WHERE actualizado >= ?", (marca,), tocados
+            )
+
+            obras, resumidas = self._contar_filas()
+            if resumidas < obras:
+                #Obras guardadas con una fecha anterior a la marca
+                cambios += self._procesar(
+                    f"SELECT {columnas} FROM obras WHERE id NOT IN (SELECT id FROM analitica_obras)",
+                    (), tocados
+                )
+                obras, resumidas = self._contar_filas()
+            if resumidas > obras:
+                #Obras eliminadas del espejo (retiradas de la colección)
+                huerfanas = self._conexion.execute(
+                    "SELECT * FROM analitica_obras WHERE id NOT IN (SELECT id FROM obras)"
+                ).fetchall()
+                for obj_id, *resumen in huerfanas:
+                    self._contar(tuple(resumen), -1, tocados)
+                self._conexion.executemany(
+                    "DELETE FROM analitica_obras WHERE id = ?", [(fila[0],) for fila in huerfanas]
+                )
+                cambios += len(huerfanas)
+
+            for dimension, valor in tocados:
+                cantidad = self._conteos[dimension][valor]
+                if cantidad > 0:
+                    self._conexion.execute(
+                        "INSERT OR REPLACE INTO analitica_conteos VALUES (?, ?, ?)",
+                        (dimension, valor, cantidad)
+                    )
+                else:
+                    del self._conteos[dimension][valor]
+                    self._conexion.execute(
+                        "DELETE FROM analitica_conteos WHERE dimension = ? AND valor = ?",
+                        (dimension, valor)
+                    )
+            if nueva_marca is not None:
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('analitica_marca', ?)", (str(nueva_marca),)
+                )
+            self._conexion.commit()
+            return cambios
+
+    def mas_frecuentes(self, dimension, limite=10):
+        #Los `limite` valores con más obras, de mayor a menor
+        with self._lock:
+            self._abrir()
+            return self._conteos[dimension].most_common(limite)
+
+    def histograma(self, dimension="decada_creacion"):
+        #Lista (década, cantidad) ordenada cronológicamente
+        with self._lock:
+            self._abrir()
+            return sorted((int(valor), cantidad) for valor, cantidad in self._conteos[dimension].items())
+
+    def resumen(self, limite=10):
+        return {dimension: self.mas_frecuentes(dimension, limite) for dimension in DIMENSIONES}
@@ -0,0 +1,151 @@
+"""
+Pruebas de rendimiento de MetroArtApp contra la API simulada local.
+
+    python benchmark.py --objetos 2000 --latencia 0.05 --tasa-429 0.02
+
+Cada escenario corre con una aplicación nueva en un directorio temporal
+(caché, índices y espejo vacíos) y reporta tiempo total, obras por segundo,
+latencias p50/p95 de las solicitudes y memoria máxima.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from imagenes import guardar_imagen_desde_url
+from limitador import LimitadorTasa
+from main import MetroArtApp
+from metricas import percentil
+from servidor_simulado import ServidorSimulado
+
+
+def _escenario_departamento(app, args):
+    obras, _ = app.obtener_obras_por_departamento(args.departamento)
+    return len(obras)
+
+
+def _escenario_autor(app, args):
+    return len(app.obtener_obras_por_autor(args.autor))
+
+
+def _escenario_nacionalidad(app, args):
+    return len(app.obtener_obras_por_nacionalidad(args.nacionalidad))
+
+
+def _escenario_imagenes(app, args):
+    descargadas = 0
+    for obj_id in range(1, args.imagenes + 1):
+        esperas = []
+        inicio = time.perf_counter()
+        ruta = guardar_imagen_desde_url(f"{app.API_URL}/images/{obj_id}.jpg", f"obra_{obj_id}", app.sesion,
+                                        limitador=app.limitador, al_esperar=esperas.append)
+        espera = sum(esperas)
+        app.metricas.registrar_solicitud("imagen", time.perf_counter() - inicio - espera,
+                                         200 if ruta else None, os.path.getsize(ruta) if ruta else 0,
+                                         espera_limitador=espera)
+        descargadas += bool(ruta)
+    return descargadas
+
+
+ESCENARIOS = {
+    "departamento": _escenario_departamento,
+    "autor": _escenario_autor,
+    "nacionalidad": _escenario_nacionalidad,
+    "imagenes": _escenario_imagenes,
+}
+
+
+def medir(nombre, escenario, url, args):
+    #Corre un escenario en frío y retorna sus números
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            app = MetroArtApp(max_concurrencia=args.concurrencia, api_url=url,
+                              limitador=LimitadorTasa(tasa_maxima=args.tasa_maxima))
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultados = escenario(app, args)
+            segundos = time.perf_counter() - inicio
+            _, memoria_max = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            os.chdir(directorio_original)
+
+    latencias = app.metricas.latencias()
+    limitador = app.limitador.estado()
+    resumen = app.metricas.resumen()["endpoints"]
+    return {
+        "escenario": nombre,
+        "resultados": resultados,
+        "solicitudes": sum(m["solicitudes"] for m in resumen.values()),
+        "errores": sum(m["errores"] for m in resumen.values()),
+        "reintentos": sum(m["reintentos"] for m in resumen.values()),
+        "segundos": segundos,
+        "solicitudes_por_segundo": sum(m["solicitudes"] for m in resumen.values()) / segundos,
+        "latencia_p50_ms": percentil(latencias, 50) * 1000,
+        "latencia_p95_ms": percentil(latencias, 95) * 1000,
+        "espera_limitador_ms": sum(m["espera_limitador_media"] * m["solicitudes"] for m in resumen.values())
+                               / max(1, sum(m["solicitudes"] for m in resumen.values())) * 1000,
+        "memoria_max_mb": memoria_max / (1024 * 1024),
+        "tasa_final": limitador["tasa"],
+        "reducciones_tasa": limitador["reducciones"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de MetroArtApp con la API simulada")
+    parser.add_argument("--objetos", type=int, default=2000, help="Obras en la colección simulada")
+    parser.add_argument("--latencia", type=float, default=0.02, help="Latencia base por solicitud (s)")
+    parser.add_argument("--variacion", type=float, default=0.01, help="Variación aleatoria de latencia (s)")
+    parser.add_argument("--errores", type=float, default=0.0, help="Proporción de respuestas 500")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Proporción de respuestas 429")
+    parser.add_argument("--retry-after", type=int, default=0, help="Valor de Retry-After en los 429")
+    parser.add_argument("--limite-servidor", type=int, default=0,
+                        help="Solicitudes por segundo que acepta el servidor (0 = sin límite)")
+    parser.add_argument("--tasa-maxima", type=float, default=80.0,
+                        help="Tope del limitador de tasa del cliente (solicitudes/s)")
+    parser.add_argument("--payload", type=int, default=0, help="Bytes extra en cada objeto")
+    parser.add_argument("--tamano-imagen", type=int, default=150_000, help="Bytes por imagen")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--departamento", type=int, default=11)
+    parser.add_argument("--autor", default="Gogh")
+    parser.add_argument("--nacionalidad", default="Dutch")
+    parser.add_argument("--imagenes", type=int, default=20, help="Imágenes a descargar")
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS),
+                        help="Lista separada por comas de escenarios a correr")
+    parser.add_argument("--json", dest="salida_json", help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    servidor = ServidorSimulado(
+        cantidad=args.objetos, latencia=args.latencia, variacion=args.variacion,
+        tasa_error=args.errores, tasa_429=args.tasa_429, retry_after=args.retry_after,
+        tamano_extra=args.payload, tamano_imagen=args.tamano_imagen,
+        limite_por_segundo=args.limite_servidor
+    )
+    filas = []
+    with servidor as url:
+        for nombre in args.escenarios.split(","):
+            filas.append(medir(nombre, ESCENARIOS[nombre.strip()], url, args))
+
+    print(f"{'Escenario':<14}{'Result.':>8}{'Solic.':>8}{'Error':>7}{'Reint.':>7}{'Seg.':>8}"
+          f"{'Sol/s':>8}{'p50 ms':>8}{'p95 ms':>8}{'Esp. ms':>8}{'MB máx':>8}{'Tasa':>7}")
+    for f in filas:
+        print(f"{f['escenario']:<14}{f['resultados']:>8}{f['solicitudes']:>8}{f['errores']:>7}"
+              f"{f['reintentos']:>7}{f['segundos']:>8.2f}{f['solicitudes_por_segundo']:>8.1f}"
+              f"{f['latencia_p50_ms']:>8.1f}{f['latencia_p95_ms']:>8.1f}{f['espera_limitador_ms']:>8.1f}"
+              f"{f['memoria_max_mb']:>8.2f}"
+              f"{f['tasa_final']:>7.1f}")
+
+    if args.salida_json:
+        with open(args.salida_json, "w", encoding="utf-8") as f:
+            json.dump(filas, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
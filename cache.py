@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from indice import conectar
+
+
+class CacheApi:
+    """
+    Caché de respuestas de la API del Met en dos niveles: un LRU en memoria
+    y una base SQLite en disco que sobrevive entre ejecuciones.
+    """
+
+    #Tiempo de vida (en segundos) según el primer segmento del endpoint
+    TTL_POR_DEFECTO = {
+        "departments": 7 * 24 * 3600,
+        "objects": 24 * 3600,
+        "search": 3600,
+    }
+
+    def __init__(self, ruta="metroart_cache.db", ttls=None, max_memoria=1000, max_disco=50000):
+        self.ruta = ruta
+        self.ttls = dict(self.TTL_POR_DEFECTO)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_memoria = max_memoria
+        self.max_disco = max_disco
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.fallos = 0
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._conexion = conectar(ruta)
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas ("
+            "clave TEXT PRIMARY KEY, endpoint TEXT, datos TEXT, "
+            "guardado REAL, usado REAL)"
+        )
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_usado ON respuestas(usado)")
+        self._conexion.commit()
+
+    @staticmethod
+    def clave(endpoint, params):
+        #Clave única de una solicitud: endpoint + parámetros ordenados
+        return json.dumps([endpoint, sorted((params or {}).items())], default=str)
+
+    def _ttl(self, endpoint):
+        return self.ttls.get(endpoint.split("/")[0].split("?")[0], 3600)
+
+    def obtener(self, endpoint, params=None):
+        #Retorna la respuesta guardada si existe y no expiró, o None
+        clave = self.clave(endpoint, params)
+        ahora = time.time()
+        ttl = self._ttl(endpoint)
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                guardado, datos = entrada
+                if ahora - guardado <= ttl:
+                    self._memoria.move_to_end(clave)
+                    self.hits_memoria += 1
+                    return datos
+                del self._memoria[clave]
+
+            fila = self._conexion.execute(
+                "SELECT datos, guardado FROM respuestas WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is not None and ahora - fila[1] <= ttl:
+                datos = json.loads(fila[0])
+                self._conexion.execute("UPDATE respuestas SET usado = ? WHERE clave = ?", (ahora, clave))
+                self._conexion.commit()
+                self._guardar_en_memoria(clave, fila[1], datos)
+                self.hits_disco += 1
+                return datos
+
+            self.fallos += 1
+            return None
+
+    def guardar(self, endpoint, params, datos):
+        #Guarda una respuesta en ambos niveles, desalojando las menos usadas
+        clave = self.clave(endpoint, params)
+        ahora = time.time()
+        with self._lock:
+            self._guardar_en_memoria(clave, ahora, datos)
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, endpoint, datos, guardado, usado) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (clave, endpoint, json.dumps(datos), ahora, ahora)
+            )
+            total = self._conexion.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0]
+            if total > self.max_disco:
+                self._conexion.execute(
+                    "DELETE FROM respuestas WHERE clave IN "
+                    "(SELECT clave FROM respuestas ORDER BY usado LIMIT ?)",
+                    (total - self.max_disco,)
+                )
+            self._conexion.commit()
+
+    def invalidar(self, endpoint, params=None):
+        #Elimina una respuesta de ambos niveles
+        clave = self.clave(endpoint, params)
+        with self._lock:
+            self._memoria.pop(clave, None)
+            self._conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+            self._conexion.commit()
+
+    def _guardar_en_memoria(self, clave, guardado, datos):
+        self._memoria[clave] = (guardado, datos)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def estadisticas(self):
+        #Retorna los contadores de aciertos y fallos de la caché
+        consultas = self.hits_memoria + self.hits_disco + self.fallos
+        aciertos = self.hits_memoria + self.hits_disco
+        return {
+            "hits_memoria": self.hits_memoria,
+            "hits_disco": self.hits_disco,
+            "fallos": self.fallos,
+            "tasa_aciertos": aciertos / consultas if consultas else 0.0,
+        }
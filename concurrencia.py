@@ -0,0 +1,83 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+
+def deduplicar(elementos):
+    #Elimina repetidos conservando el orden de la primera aparición
+    return list(dict.fromkeys(elementos))
+
+
+def obtener_en_paralelo(funcion, elementos, max_workers=8, al_completar=None,
+                        al_resultado=None, cancelar=None):
+    """
+    Ejecuta `funcion` sobre cada elemento usando un pool de hilos acotado.
+    Retorna una lista con los resultados en el mismo orden de `elementos`
+    (None donde la llamada falló o devolvió un resultado vacío) y la
+    cantidad de errores.
+    `al_resultado(indice, resultado)` se llama con cada resultado apenas llega.
+    Si el evento `cancelar` se activa, las llamadas que no empezaron se descartan.
+    """
+    elementos = list(elementos)
+    resultados = [None] * len(elementos)
+    errores = 0
+    if not elementos:
+        return resultados, errores
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futuros = {executor.submit(funcion, elem): i for i, elem in enumerate(elementos)}
+        for completados, futuro in enumerate(as_completed(futuros), start=1):
+            if cancelar is not None and cancelar.is_set():
+                for pendiente in futuros:
+                    pendiente.cancel()
+                break
+            indice = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception:
+                resultado = None
+            if resultado:
+                resultados[indice] = resultado
+                if al_resultado:
+                    al_resultado(indice, resultado)
+            else:
+                errores += 1
+            if al_completar:
+                al_completar(completados)
+
+    return resultados, errores
+
+
+class VueloUnico:
+    """
+    Agrupa llamadas concurrentes con la misma clave: la primera ejecuta la
+    función y las demás esperan y reciben el mismo resultado (o excepción).
+    """
+
+    def __init__(self):
+        self.coalescidas = 0
+        self._en_vuelo = {}
+        self._lock = threading.Lock()
+
+    def ejecutar(self, clave, funcion):
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._en_vuelo[clave] = futuro
+            else:
+                self.coalescidas += 1
+        if not lider:
+            return futuro.result()
+
+        try:
+            resultado = funcion()
+        except BaseException as error:
+            futuro.set_exception(error)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
@@ -0,0 +1,298 @@
+import glob
+import multiprocessing
+import os
+import queue
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from almacen import AlmacenObras
+from cache import CacheApi
+from indice import IndiceObras, IndiceNacionalidades
+from limitador import LimitadorCompartido
+
+
+def obtener_ids_coleccion(app, departamento_id=None):
+    #Retorna todos los objectIDs de un departamento o de la colección completa
+    params = {"departmentIds": departamento_id} if departamento_id else None
+    data = app._obtener_datos_api("objects", params=params, usar_cache=False)
+    return data.get("objectIDs", []) or []
+
+
+def _agrupar_por_departamento(datos, departamentos_por_nombre, departamento_id):
+    #Agrupa las obras por ID de departamento (a partir de su nombre si hace falta)
+    grupos = defaultdict(list)
+    for data in datos:
+        dep_id = departamento_id or departamentos_por_nombre.get(data.get("department"))
+        grupos[dep_id].append(data)
+    return grupos
+
+
+def _descargar_en_lotes(app, object_ids, departamento_id, departamentos_por_nombre,
+                        tamano_lote, pausa_maxima, informar, al_terminar_lote=None, indexar=True):
+    """
+    Descarga las obras por lotes concurrentes y las guarda en el almacén y,
+    si `indexar` es verdadero, en los índices y la analítica. Si un lote
+    falla en su mayoría se asume límite de tasa y se espera (cada vez más)
+    antes de continuar. Retorna (guardadas, errores).
+    """
+    inicio = time.time()
+    guardadas = 0
+    errores_totales = 0
+    pausa = 0.0
+    for i in range(0, len(object_ids), tamano_lote):
+        lote = object_ids[i:i + tamano_lote]
+        datos, errores_api = app._obtener_objetos(lote, registrar=False, usar_cache=False)
+
+        grupos = _agrupar_por_departamento(datos, departamentos_por_nombre, departamento_id)
+        for dep_id, datos_grupo in grupos.items():
+            app.almacen.guardar(datos_grupo, dep_id)
+        if indexar:
+            app._registrar_obras(datos)
+        guardadas += len(datos)
+        errores_totales += errores_api
+        if al_terminar_lote:
+            al_terminar_lote()
+
+        transcurrido = max(time.time() - inicio, 1e-6)
+        procesadas = min(i + tamano_lote, len(object_ids))
+        informar(f"[{procesadas}/{len(object_ids)}] {guardadas} guardadas, "
+                 f"{errores_totales} errores, {guardadas / transcurrido:.1f} obras/s")
+
+        if lote and errores_api > len(lote) // 2:
+            pausa = min(pausa_maxima, max(1.0, pausa * 2))
+            informar(f"Muchos errores en el lote; esperando {pausa:.0f}s antes de seguir...")
+            time.sleep(pausa)
+        else:
+            pausa = 0.0
+
+    if indexar:
+        app.analitica.actualizar()
+    return guardadas, errores_totales
+
+
+def cosechar(app, departamento_id=None, tamano_lote=200, pausa_maxima=60.0, informar=print):
+    """
+    Descarga al almacén local todas las obras de un departamento (o de la
+    colección completa si no se indica) usando el motor concurrente de la app.
+    Es reanudable: las obras ya guardadas se omiten.
+    Retorna la cantidad de obras guardadas en esta ejecución.
+    """
+    almacen = app.almacen
+    object_ids = obtener_ids_coleccion(app, departamento_id)
+    if not object_ids:
+        informar("No se pudo obtener la lista de obras.")
+        return 0
+    pendientes, departamentos_por_nombre = _preparar_cosecha(app, object_ids, departamento_id, informar)
+
+    nuevas, errores_totales = _descargar_en_lotes(
+        app, pendientes, departamento_id, departamentos_por_nombre, tamano_lote, pausa_maxima,
+        informar, lambda: almacen.marcar_cosecha(departamento_id, len(object_ids), False)
+    )
+    _terminar_cosecha(almacen, departamento_id, len(object_ids), errores_totales, informar)
+    return nuevas
+
+
+def _preparar_cosecha(app, object_ids, departamento_id, informar):
+    #Retorna los IDs que faltan descargar y el mapa nombre -> ID de departamento
+    almacen = app.almacen
+    guardadas = almacen.ids_guardados(object_ids)
+    if departamento_id:
+        almacen.vincular_departamento(departamento_id, guardadas)
+    pendientes = [obj_id for obj_id in object_ids if obj_id not in guardadas]
+    informar(f"{len(object_ids)} obras en total, {len(guardadas)} ya guardadas, "
+             f"{len(pendientes)} pendientes.")
+
+    departamentos_por_nombre = {}
+    if not departamento_id:
+        departamentos_por_nombre = {dep.nombre: dep.id for dep in app.obtener_departamentos()}
+    return pendientes, departamentos_por_nombre
+
+
+def _terminar_cosecha(almacen, departamento_id, total, errores_totales, informar):
+    completa = errores_totales == 0
+    almacen.marcar_cosecha(departamento_id, total, completa)
+    if not completa:
+        informar(f"Quedaron {errores_totales} obras sin descargar; "
+                 f"vuelva a ejecutar la cosecha para reintentarlas.")
+    if not almacen.obtener_meta("ultima_sincronizacion"):
+        almacen.guardar_meta("ultima_sincronizacion", time.strftime("%Y-%m-%d", time.gmtime()))
+
+
+#Límite de tasa y cola de mensajes compartidos, recibidos por cada proceso
+#de la cosecha en paralelo
+_limitador_global = None
+_mensajes_global = None
+
+
+def _iniciar_proceso(limitador, mensajes):
+    global _limitador_global, _mensajes_global
+    _limitador_global = limitador
+    _mensajes_global = mensajes
+
+
+def _informar_proceso(numero):
+    #Los mensajes de cada proceso se envían al principal, que los muestra con su `informar`
+    return lambda mensaje: _mensajes_global.put(f"[proceso {numero}] {mensaje}")
+
+
+def _mostrar_mensajes(mensajes, informar, espera=0.0):
+    #Muestra los mensajes pendientes de los procesos, esperando hasta `espera` el primero
+    try:
+        informar(mensajes.get(timeout=espera) if espera else mensajes.get_nowait())
+        while True:
+            informar(mensajes.get_nowait())
+    except queue.Empty:
+        pass
+
+
+def _cosechar_parte(numero, object_ids, api_url, ruta_parte, departamento_id,
+                    departamentos_por_nombre, max_concurrencia, tamano_lote, pausa_maxima):
+    """
+    Trabajo de cada proceso: descarga su parte de los IDs con su propia
+    sesión HTTP y guarda las obras en su propio archivo SQLite, que el
+    proceso principal fusiona (e indexa) después. Retorna (guardadas, errores).
+    """
+    from main import MetroArtApp
+    app = MetroArtApp(
+        max_concurrencia=max_concurrencia, api_url=api_url, cache=CacheApi(ruta=":memory:"),
+        indice=IndiceObras(ruta=None), nacionalidades=IndiceNacionalidades(ruta=None),
+        almacen=AlmacenObras(ruta_parte), limitador=_limitador_global
+    )
+    return _descargar_en_lotes(
+        app, object_ids, departamento_id, departamentos_por_nombre, tamano_lote, pausa_maxima,
+        _informar_proceso(numero), indexar=False
+    )
+
+
+def _ruta_parte(almacen, numero):
+    return f"{almacen.ruta}.parte{numero}.db"
+
+
+def _fusionar_partes(app, informar):
+    """
+    Fusiona en el almacén de la app los archivos de cada proceso (también
+    los que haya dejado una cosecha interrumpida), alimenta los índices con
+    sus obras y borra los archivos. Retorna la cantidad de obras fusionadas.
+    """
+    fusionadas = 0
+    for ruta in sorted(glob.glob(_ruta_parte(app.almacen, "*"))):
+        ids = app.almacen.fusionar(ruta)
+        for i in range(0, len(ids), 1000):
+            app._registrar_obras(app.almacen.datos_indexables(ids[i:i + 1000]))
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+        fusionadas += len(ids)
+    if fusionadas:
+        app.analitica.actualizar()
+        informar(f"{fusionadas} obras fusionadas en {app.almacen.ruta}.")
+    return fusionadas
+
+
+def cosechar_en_paralelo(app, departamento_id=None, procesos=4, tasa_maxima=80.0,
+                         tamano_lote=200, pausa_maxima=60.0, informar=print):
+    """
+    Como `cosechar`, pero reparte los IDs pendientes entre varios procesos
+    para que decodificar el JSON no quede limitado por el GIL. Cada proceso
+    usa su propio pool de conexiones y escribe en su propio archivo SQLite;
+    todos comparten un único límite de `tasa_maxima` solicitudes por
+    segundo. Al final los archivos se fusionan en el almacén de la app.
+    Retorna la cantidad de obras guardadas en esta ejecución.
+    """
+    almacen = app.almacen
+    _fusionar_partes(app, informar)
+    object_ids = obtener_ids_coleccion(app, departamento_id)
+    if not object_ids:
+        informar("No se pudo obtener la lista de obras.")
+        return 0
+    pendientes, departamentos_por_nombre = _preparar_cosecha(app, object_ids, departamento_id, informar)
+    partes = [parte for parte in (pendientes[i::procesos] for i in range(procesos)) if parte]
+    if not partes:
+        _terminar_cosecha(almacen, departamento_id, len(object_ids), 0, informar)
+        return 0
+
+    informar(f"Descargando con {len(partes)} procesos (máximo {tasa_maxima:.0f} solicitudes/s en total)...")
+    limitador = LimitadorCompartido(tasa_inicial=min(40.0, tasa_maxima), tasa_maxima=tasa_maxima)
+    mensajes = multiprocessing.Queue()
+    almacen.marcar_cosecha(departamento_id, len(object_ids), False)
+    with ProcessPoolExecutor(max_workers=len(partes), initializer=_iniciar_proceso,
+                             initargs=(limitador, mensajes)) as executor:
+        futuros = [
+            executor.submit(
+                _cosechar_parte, numero, parte, app.API_URL, _ruta_parte(almacen, numero),
+                departamento_id, departamentos_por_nombre, app.max_concurrencia, tamano_lote,
+                pausa_maxima
+            )
+            for numero, parte in enumerate(partes)
+        ]
+        while not all(futuro.done() for futuro in futuros):
+            _mostrar_mensajes(mensajes, informar, espera=0.2)
+        errores_totales = 0
+        for futuro in futuros:
+            try:
+                errores_totales += futuro.result()[1]
+            except Exception as error:
+                informar(f"Un proceso de la cosecha falló: {error}")
+                errores_totales += 1
+    _mostrar_mensajes(mensajes, informar)
+
+    nuevas = _fusionar_partes(app, informar)
+    _terminar_cosecha(almacen, departamento_id, len(object_ids), errores_totales, informar)
+    return nuevas
+
+
+def sincronizar(app, desde=None, tamano_lote=200, pausa_maxima=60.0, informar=print):
+    """
+    Actualiza el espejo local con las obras modificadas desde la última
+    sincronización (endpoint objects?metadataDate=), reemplazándolas en el
+    almacén y en los índices, y elimina las obras retiradas de la colección.
+    Retorna (actualizadas, eliminadas).
+    """
+    almacen = app.almacen
+    desde = desde or almacen.obtener_meta("ultima_sincronizacion")
+    if not desde:
+        informar("El espejo local está vacío; ejecute primero la cosecha.")
+        return 0, 0
+    hoy = time.strftime("%Y-%m-%d", time.gmtime())
+
+    data = app._obtener_datos_api("objects", params={"metadataDate": desde}, usar_cache=False)
+    if not data:
+        informar("No se pudo obtener la lista de obras modificadas.")
+        return 0, 0
+    modificadas = data.get("objectIDs", []) or []
+    coleccion_completa = almacen.departamento_completo(0)
+    if coleccion_completa:
+        #Con la colección completa en el espejo también se agregan las obras nuevas
+        por_actualizar = modificadas
+    else:
+        guardadas = almacen.ids_guardados(modificadas)
+        por_actualizar = [obj_id for obj_id in modificadas if obj_id in guardadas]
+    informar(f"{len(modificadas)} obras modificadas desde {desde}, "
+             f"{len(por_actualizar)} presentes en el espejo local.")
+
+    departamentos_por_nombre = {dep.nombre: dep.id for dep in app.obtener_departamentos()}
+    actualizadas, errores = _descargar_en_lotes(
+        app, por_actualizar, None, departamentos_por_nombre, tamano_lote, pausa_maxima, informar
+    )
+    for obj_id in por_actualizar:
+        app.cache.invalidar(f"objects/{obj_id}")
+
+    vigentes = set(obtener_ids_coleccion(app))
+    eliminadas = []
+    if vigentes:
+        eliminadas = [obj_id for obj_id in almacen.ids() if obj_id not in vigentes]
+        almacen.eliminar(eliminadas)
+        app.indice.eliminar_varios(eliminadas)
+        app.nacionalidades.eliminar_varios(eliminadas)
+        for obj_id in eliminadas:
+            app.cache.invalidar(f"objects/{obj_id}")
+        app.analitica.actualizar()
+    informar(f"{actualizadas} obras actualizadas, {len(eliminadas)} retiradas eliminadas.")
+
+    if errores == 0:
+        almacen.guardar_meta("ultima_sincronizacion", hoy)
+    else:
+        informar(f"{errores} obras no se pudieron actualizar; "
+                 f"la próxima sincronización volverá a intentarlo.")
+    return actualizadas, len(eliminadas)
@@ -0,0 +1,267 @@
+"""
+Consultas sin menús para alimentar otros procesos. Los resultados se
+entregan como un flujo de filas (diccionarios) a medida que llegan de la API
+y se pueden escribir en JSONL, CSV o Parquet (este último requiere pyarrow).
+
+Desde Python:
+
+    app = MetroArtApp()
+    filas = consultar(app, "autor", ["Gogh", "Monet", "Rembrandt"])
+    exportar(filas, "autores.csv")
+
+Desde la línea de comandos:
+
+    python main.py export autor --archivo autores.txt -o autores.parquet
+    python main.py export departamento 11 | jq .titulo
+"""
+import contextlib
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+FORMATOS = ("jsonl", "csv", "parquet")
+
+CONSULTAS = ("departamentos", "departamento", "autor", "nacionalidad")
+
+#Columnas de cada fila según la consulta
+CAMPOS_DEPARTAMENTO = ("id", "nombre")
+CAMPOS_OBRA = ("consulta", "id", "titulo", "artista", "nacionalidad")
+
+
+def iterar_departamentos(app):
+    for departamento in app.obtener_departamentos():
+        yield departamento
+
+
+def _iterar_por_lotes(app, object_ids, tamano_lote):
+    #Carga las obras de a un lote por vez para no retener la lista completa
+    errores = 0
+    for i in range(0, len(object_ids), tamano_lote):
+        obras, errores_api = app._cargar_obras(object_ids[i:i + tamano_lote])
+        errores += errores_api
+        yield from obras
+    if errores > 0:
+        print(f"(Se omitieron {errores} obras por problemas de conexión con la API)")
+
+
+def iterar_obras_por_departamento(app, departamento_id, tamano_lote=100):
+    """
+    Genera todas las obras del departamento (sin el límite de 200 del menú),
+    desde el espejo local si está cosechado o descargándolas por lotes.
+    """
+    if app.almacen.departamento_completo(departamento_id):
+        yield from app.almacen.obras_de_departamento(departamento_id)
+        return
+    params = {"departmentId": departamento_id, "q": "art"}
+    object_ids = app._obtener_datos_api("search", params=params).get("objectIDs", []) or []
+    yield from _iterar_por_lotes(app, object_ids, tamano_lote)
+
+
+def iterar_obras_por_nacionalidad(app, nacionalidad, tamano_lote=100):
+    yield from _iterar_por_lotes(app, app._ids_por_nacionalidad(nacionalidad), tamano_lote)
+
+
+def iterar_obras_por_autor(app, nombre_autor):
+    yield from app.obtener_obras_por_autor(nombre_autor)
+
+
+def _intercalar(generadores, simultaneas):
+    """
+    Consume varios generadores en hilos aparte y entrega sus elementos a
+    medida que llegan. La cola acotada frena a los productores si el
+    consumidor es más lento; al cerrar el generador los hilos se detienen.
+    """
+    cola = queue.Queue(maxsize=1000)
+    detener = threading.Event()
+    fin = object()
+
+    def poner(elemento):
+        while not detener.is_set():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def consumir(generador):
+        try:
+            for elemento in generador:
+                if not poner(elemento):
+                    return
+        finally:
+            poner(fin)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, simultaneas))
+    futuros = [executor.submit(consumir, generador) for generador in generadores]
+    try:
+        pendientes = len(futuros)
+        while pendientes:
+            elemento = cola.get()
+            if elemento is fin:
+                pendientes -= 1
+            else:
+                yield elemento
+        for futuro in futuros:
+            futuro.result()
+    finally:
+        detener.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _filas_de_obras(obras, consulta):
+    for obra in obras:
+        yield {
+            "consulta": consulta,
+            "id": obra.id,
+            "titulo": obra.titulo,
+            "artista": obra.artista,
+            "nacionalidad": obra.nacionalidad,
+        }
+
+
+def consultar(app, consulta, valores=(), simultaneas=4):
+    """
+    Genera las filas de una consulta ("departamentos", "departamento",
+    "autor" o "nacionalidad"). Con varios valores (por ejemplo, muchos
+    autores) se procesan hasta `simultaneas` a la vez, compartiendo la
+    caché, la sesión y los índices de la aplicación. Cada fila indica en
+    "consulta" el valor que la produjo.
+    """
+    if consulta == "departamentos":
+        for departamento in iterar_departamentos(app):
+            yield {"id": departamento.id, "nombre": departamento.nombre}
+        return
+
+    if consulta == "departamento":
+        iterar = lambda valor: iterar_obras_por_departamento(app, int(valor))
+    elif consulta == "autor":
+        iterar = lambda valor: iterar_obras_por_autor(app, valor)
+    elif consulta == "nacionalidad":
+        iterar = lambda valor: iterar_obras_por_nacionalidad(app, valor)
+    else:
+        raise ValueError(f"Consulta desconocida: {consulta}")
+
+    valores = list(dict.fromkeys(valores))
+    if len(valores) == 1:
+        yield from _filas_de_obras(iterar(valores[0]), valores[0])
+        return
+    yield from _intercalar(
+        [_filas_de_obras(iterar(valor), valor) for valor in valores], simultaneas
+    )
+
+
+def leer_valores(ruta):
+    #Lee un valor por línea, ignorando líneas vacías y comentarios (#)
+    with open(ruta, encoding="utf-8") as f:
+        return [linea.strip() for linea in f if linea.strip() and not linea.lstrip().startswith("#")]
+
+
+def inferir_formato(ruta):
+    #Formato según la extensión del archivo; JSONL para la salida estándar
+    extension = os.path.splitext(ruta)[1].lower().lstrip(".")
+    if extension == "ndjson":
+        return "jsonl"
+    return extension if extension in FORMATOS else "jsonl"
+
+
+class _EscritorJsonl:
+    def __init__(self, salida, campos):
+        self._salida = salida
+
+    def escribir(self, fila):
+        self._salida.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+    def cerrar(self):
+        self._salida.flush()
+
+
+class _EscritorCsv:
+    def __init__(self, salida, campos):
+        self._salida = salida
+        self._escritor = csv.DictWriter(salida, fieldnames=campos)
+        self._escritor.writeheader()
+
+    def escribir(self, fila):
+        self._escritor.writerow(fila)
+
+    def cerrar(self):
+        self._salida.flush()
+
+
+class _EscritorParquet:
+    #Acumula filas y escribe un grupo de filas de Parquet cada `filas_por_grupo`
+
+    def __init__(self, ruta, campos, filas_por_grupo=10000):
+        #pyarrow tarda en importarse: solo se carga al exportar en Parquet
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Para exportar en Parquet hay que instalar pyarrow") from None
+        self._pyarrow = pyarrow
+        self._campos = campos
+        self._filas_por_grupo = filas_por_grupo
+        self._columnas = {campo: [] for campo in campos}
+        self._cantidad = 0
+        esquema = pyarrow.schema([
+            (campo, pyarrow.int64() if campo == "id" else pyarrow.string()) for campo in campos
+        ])
+        self._escritor = pyarrow.parquet.ParquetWriter(ruta, esquema)
+
+    def escribir(self, fila):
+        for campo in self._campos:
+            valor = fila.get(campo)
+            self._columnas[campo].append(valor if campo == "id" or valor is None else str(valor))
+        self._cantidad += 1
+        if self._cantidad >= self._filas_por_grupo:
+            self._vaciar()
+
+    def _vaciar(self):
+        if self._cantidad:
+            self._escritor.write_table(self._pyarrow.table(self._columnas, schema=self._escritor.schema))
+            self._columnas = {campo: [] for campo in self._campos}
+            self._cantidad = 0
+
+    def cerrar(self):
+        self._vaciar()
+        self._escritor.close()
+
+
+def exportar(filas, ruta="-", formato=None, campos=CAMPOS_OBRA):
+    """
+    Escribe las filas en `ruta` ("-" es la salida estándar) a medida que se
+    generan y retorna la cantidad escrita. Mientras se escribe en la salida
+    estándar, los mensajes de la aplicación se desvían a stderr.
+    """
+    formato = formato or inferir_formato(ruta)
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato}")
+    if formato == "parquet" and ruta == "-":
+        raise ValueError("El formato Parquet necesita un archivo de salida")
+
+    with contextlib.ExitStack() as pila:
+        if formato == "parquet":
+            escritor = _EscritorParquet(ruta, campos)
+        else:
+            if ruta == "-":
+                salida = sys.stdout
+                pila.enter_context(contextlib.redirect_stdout(sys.stderr))
+            else:
+                salida = pila.enter_context(open(ruta, "w", encoding="utf-8", newline=""))
+            clase = _EscritorCsv if formato == "csv" else _EscritorJsonl
+            escritor = clase(salida, campos)
+
+        cantidad = 0
+        try:
+            for fila in filas:
+                escritor.escribir(fila)
+                cantidad += 1
+        finally:
+            escritor.cerrar()
+    return cantidad
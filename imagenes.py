@@ -0,0 +1,157 @@
+import glob
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from sesion import solicitar
+
+
+def guardar_imagen_desde_url(url, nombre_archivo, sesion=None, al_reintentar=None, limitador=None,
+                             al_esperar=None):
+
+    #Descarga una imagen desde una URL y la guarda en disco.
+    #Usa la sesión compartida si se indica, para reutilizar conexiones.
+    #Retorna la ruta del archivo guardado o None si falla.
+
+    try:
+        resp = solicitar(sesion or requests, url, stream=True, al_reintentar=al_reintentar,
+                         limitador=limitador, al_esperar=al_esperar)
+        content_type = resp.headers.get('Content-Type', '')
+        extension = '.png'
+        if 'image/jpeg' in content_type:
+            extension = '.jpg'
+        elif 'image/svg+xml' in content_type:
+            extension = '.svg'
+        nombre_archivo_final = f"{nombre_archivo}{extension}"
+        with open(nombre_archivo_final, 'wb') as f:
+            for chunk in resp.iter_content(chunk_size=8192):
+                f.write(chunk)
+        return nombre_archivo_final
+    except Exception:
+        return None
+
+
+class CacheImagenes:
+    """
+    Caché en disco de imágenes de obras, indexada por ID de obra y hash del
+    contenido. Descarga en segundo plano, genera miniaturas y respeta una
+    cuota de espacio desalojando los archivos usados hace más tiempo.
+    """
+
+    def __init__(self, directorio="cache_imagenes", cuota_bytes=200 * 1024 * 1024,
+                 tamano_miniatura=(1024, 1024), sesion=None, metricas=None, limitador=None):
+        self.directorio = directorio
+        self.cuota_bytes = cuota_bytes
+        self.tamano_miniatura = tamano_miniatura
+        self.sesion = sesion
+        self.metricas = metricas
+        self.limitador = limitador
+        self._futuros = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        os.makedirs(directorio, exist_ok=True)
+
+    @staticmethod
+    def elegir_url(detalle):
+        #Prefiere la versión reducida de la imagen, suficiente para verla en pantalla
+        return getattr(detalle, "url_imagen_small", "") or detalle.url_imagen
+
+    def _buscar(self, obj_id):
+        #Retorna la ruta de la imagen guardada de la obra, o None
+        for ruta in glob.glob(os.path.join(self.directorio, f"obra_{obj_id}_*")):
+            if "_mini" not in ruta and not ruta.endswith(".tmp"):
+                os.utime(ruta)
+                return ruta
+        return None
+
+    def _descargar(self, obj_id, url):
+        ruta = self._buscar(obj_id)
+        if ruta:
+            return ruta
+        reintentos = []
+        esperas = []
+        inicio = time.perf_counter()
+        temporal = guardar_imagen_desde_url(
+            url, os.path.join(self.directorio, f"descarga_{obj_id}"), self.sesion,
+            al_reintentar=reintentos.append, limitador=self.limitador, al_esperar=esperas.append
+        )
+        if self.metricas is not None:
+            espera = sum(esperas)
+            self.metricas.registrar_solicitud(
+                "imagen", time.perf_counter() - inicio - espera, 200 if temporal else None,
+                os.path.getsize(temporal) if temporal else 0, len(reintentos), espera
+            )
+        if not temporal:
+            return None
+        sha1 = hashlib.sha1()
+        with open(temporal, "rb") as f:
+            for bloque in iter(lambda: f.read(65536), b""):
+                sha1.update(bloque)
+        extension = os.path.splitext(temporal)[1]
+        ruta = os.path.join(self.directorio, f"obra_{obj_id}_{sha1.hexdigest()[:12]}{extension}")
+        os.replace(temporal, ruta)
+        self._aplicar_cuota()
+        return ruta
+
+    def precargar(self, obj_id, url):
+        #Inicia la descarga en segundo plano y retorna el Future correspondiente
+        with self._lock:
+            futuro = self._futuros.get(obj_id)
+            if futuro is None or (futuro.done() and (futuro.exception() or futuro.result() is None)):
+                futuro = self._executor.submit(self._descargar, obj_id, url)
+                self._futuros[obj_id] = futuro
+            return futuro
+
+    def obtener(self, obj_id, url):
+        #Retorna la ruta local de la imagen, esperando la descarga si hace falta
+        return self.precargar(obj_id, url).result()
+
+    def miniatura(self, ruta):
+        """
+        Retorna la ruta de una miniatura JPEG de la imagen, creándola si no
+        existe. Usa Image.draft para que el decodificador JPEG trabaje a
+        resolución reducida. Si la imagen no se puede procesar, retorna la original.
+        """
+        base, extension = os.path.splitext(ruta)
+        if extension == ".svg":
+            return ruta
+        ruta_mini = f"{base}_mini.jpg"
+        if os.path.exists(ruta_mini):
+            os.utime(ruta_mini)
+            return ruta_mini
+        from PIL import Image
+        try:
+            with Image.open(ruta) as imagen:
+                imagen.draft("RGB", self.tamano_miniatura)
+                imagen.thumbnail(self.tamano_miniatura)
+                imagen.convert("RGB").save(ruta_mini, "JPEG", quality=85)
+        except Exception:
+            return ruta
+        self._aplicar_cuota()
+        return ruta_mini
+
+    def _aplicar_cuota(self):
+        #Elimina los archivos usados hace más tiempo hasta respetar la cuota
+        archivos = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.startswith("descarga_"):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((estado.st_mtime, estado.st_size, ruta))
+        total = sum(tamano for _, tamano, _ in archivos)
+        for _, tamano, ruta in sorted(archivos):
+            if total <= self.cuota_bytes:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+            except OSError:
+                pass
@@ -0,0 +1,491 @@
+import heapq
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import chain
+
+from obra import Obra
+
+
+#Campos de cada obra que se indexan, con la clave de la API de donde salen
+CAMPOS_INDEXADOS = {
+    "titulo": "title",
+    "artista": "artistDisplayName",
+    "nacionalidad": "artistNationality",
+    "departamento": "department",
+    "clasificacion": "classification",
+}
+
+
+def normalizar(texto):
+    #Pasa a minúsculas y elimina acentos: "Velázquez" -> "velazquez"
+    texto = unicodedata.normalize("NFKD", str(texto or ""))
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto):
+    #Separa un texto normalizado en palabras
+    return re.findall(r"\w+", normalizar(texto))
+
+
+def conectar(ruta):
+    #Conexión SQLite compartida entre hilos (en memoria si no hay ruta), usada
+    #por todos los módulos que guardan datos locales
+    conexion = sqlite3.connect(ruta or ":memory:", check_same_thread=False, timeout=30)
+    #WAL evita un fsync completo por cada commit
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    return conexion
+
+
+def en_lotes(ids, tamano=900):
+    #Divide los IDs en grupos que no superen el límite de parámetros de SQLite
+    ids = [int(obj_id) for obj_id in ids]
+    for i in range(0, len(ids), tamano):
+        yield ids[i:i + tamano]
+
+
+class IndiceObras:
+    """
+    Índice invertido local de todas las obras descargadas alguna vez.
+    Permite responder búsquedas por artista, título, nacionalidad,
+    departamento o clasificación sin consultar la API. Vive en tablas de
+    la base SQLite del espejo: cada obra registrada se inserta por separado,
+    sin reescribir el índice completo.
+    """
+
+    def __init__(self, ruta="metroart.db"):
+        self.ruta = ruta
+        self._lock = threading.RLock()
+        self._conexion = conectar(ruta)
+        self._conexion.executescript(
+            "CREATE TABLE IF NOT EXISTS indice_obras ("
+            " id INTEGER PRIMARY KEY, titulo TEXT, artista TEXT, nacionalidad TEXT,"
+            " departamento TEXT, clasificacion TEXT);"
+            "CREATE TABLE IF NOT EXISTS indice_terminos ("
+            " termino TEXT, id INTEGER, PRIMARY KEY (termino, id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_indice_terminos_id ON indice_terminos(id);"
+            "CREATE INDEX IF NOT EXISTS idx_indice_obras_artista ON indice_obras(artista);"
+        )
+        self._conexion.commit()
+
+    def registrar_varios(self, datos):
+        """
+        Agrega o actualiza varias obras en una sola transacción. Solo se
+        reescriben los términos de las obras cuyos campos cambiaron.
+        """
+        registros = {}
+        for data in datos:
+            obj_id = data.get("objectID")
+            if obj_id:
+                registros[int(obj_id)] = tuple(
+                    (data.get(clave) or "").strip() for clave in CAMPOS_INDEXADOS.values()
+                )
+        if not registros:
+            return
+        with self._lock:
+            anteriores = {}
+            for lote in en_lotes(registros):
+                for fila in self._conexion.execute(
+                        f"SELECT * FROM indice_obras WHERE id IN ({', '.join('?' * len(lote))})", lote):
+                    anteriores[fila[0]] = fila[1:]
+            cambiados = [(obj_id, registro) for obj_id, registro in registros.items()
+                         if anteriores.get(obj_id) != registro]
+            if not cambiados:
+                return
+            self._conexion.executemany(
+                "DELETE FROM indice_terminos WHERE id = ?",
+                [(obj_id,) for obj_id, _ in cambiados if obj_id in anteriores]
+            )
+            self._conexion.executemany(
+                f"INSERT OR REPLACE INTO indice_obras VALUES ({', '.join('?' * (len(CAMPOS_INDEXADOS) + 1))})",
+                [(obj_id, *registro) for obj_id, registro in cambiados]
+            )
+            self._conexion.executemany(
+                "INSERT OR IGNORE INTO indice_terminos VALUES (?, ?)",
+                [(termino, obj_id) for obj_id, registro in cambiados for termino in self._terminos(registro)]
+            )
+            self._conexion.commit()
+
+    def eliminar_varios(self, ids):
+        filas = [(int(obj_id),) for obj_id in ids]
+        with self._lock:
+            self._conexion.executemany("DELETE FROM indice_obras WHERE id = ?", filas)
+            self._conexion.executemany("DELETE FROM indice_terminos WHERE id = ?", filas)
+            self._conexion.commit()
+
+    @staticmethod
+    def _terminos(registro):
+        for campo, valor in zip(CAMPOS_INDEXADOS, registro):
+            for token in tokenizar(valor):
+                yield f"{campo}:{token}"
+
+    def buscar(self, texto, campo=None):
+        """
+        Retorna los IDs de las obras en las que todas las palabras de `texto`
+        aparecen (como palabra o prefijo) en `campo`, o en cualquier campo
+        si no se indica. Los IDs se retornan ordenados.
+        """
+        tokens = tokenizar(texto)
+        if not tokens:
+            return []
+        campos = [campo] if campo else list(CAMPOS_INDEXADOS)
+        #Por cada palabra, las obras con algún término que empiece por ella
+        #(un rango de la clave primaria por campo); luego la intersección de todas
+        consultas = []
+        parametros = []
+        for token in dict.fromkeys(tokens):
+            consultas.append("SELECT id FROM (" + " UNION ".join(
+                "SELECT id FROM indice_terminos WHERE termino >= ? AND termino < ?" for _ in campos
+            ) + ")")
+            for c in campos:
+                prefijo = f"{c}:{token}"
+                parametros += [prefijo, prefijo + "\U0010ffff"]
+        with self._lock:
+            filas = self._conexion.execute(" INTERSECT ".join(consultas) + " ORDER BY 1", parametros)
+            return [fila[0] for fila in filas]
+
+    def obras(self, ids):
+        #Construye objetos Obra a partir de los registros locales, en el orden de `ids`
+        registros = {}
+        with self._lock:
+            for lote in en_lotes(ids):
+                for fila in self._conexion.execute(
+                        "SELECT id, titulo, artista, nacionalidad FROM indice_obras "
+                        f"WHERE id IN ({', '.join('?' * len(lote))})", lote):
+                    registros[fila[0]] = fila
+        obras = []
+        for obj_id in ids:
+            registro = registros.get(int(obj_id))
+            if registro is not None:
+                obras.append(Obra(
+                    registro[0],
+                    registro[1] or "Sin título",
+                    registro[2] or "Desconocido",
+                    registro[3] or "Desconocida"
+                ))
+        return obras
+
+    def ids_de_artista(self, nombre):
+        #IDs (ordenados) de las obras cuyo artista es exactamente `nombre`
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT id FROM indice_obras WHERE artista = ? ORDER BY id", (nombre.strip(),)
+            )
+            return [fila[0] for fila in filas]
+
+    def cantidades_por_artista(self, nombres=None):
+        #Diccionario artista -> cantidad de obras (de todos o de los `nombres` indicados)
+        with self._lock:
+            if nombres is None:
+                return dict(self._conexion.execute(
+                    "SELECT artista, COUNT(*) FROM indice_obras WHERE artista != '' GROUP BY artista"
+                ))
+            cantidades = {}
+            nombres = list(nombres)
+            for i in range(0, len(nombres), 900):
+                lote = nombres[i:i + 900]
+                cantidades.update(self._conexion.execute(
+                    "SELECT artista, COUNT(*) FROM indice_obras "
+                    f"WHERE artista IN ({', '.join('?' * len(lote))}) GROUP BY artista", lote
+                ))
+            return cantidades
+
+    def __contains__(self, obj_id):
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT 1 FROM indice_obras WHERE id = ?", (int(obj_id),)
+            ).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM indice_obras").fetchone()[0]
+
+
+class IndiceNacionalidades:
+    """
+    Índice nacionalidad -> IDs de obras, guardado en la base SQLite del
+    espejo. Las nacionalidades de la API se normalizan contra la lista
+    `Nacionalidades`, de modo que elegir una nacionalidad es una consulta
+    directa por clave primaria.
+    """
+
+    def __init__(self, ruta="metroart.db", nacionalidades=None):
+        self.ruta = ruta
+        self._lista = nacionalidades
+        self._normalizadas = None
+        self._por_palabras = None
+        #Listas ordenadas ya consultadas, hasta que cambie su nacionalidad
+        self._ordenados = {}
+        self._lock = threading.RLock()
+        self._conexion = conectar(ruta)
+        self._conexion.executescript(
+            "CREATE TABLE IF NOT EXISTS indice_nacionalidades ("
+            " nacionalidad TEXT, id INTEGER, PRIMARY KEY (nacionalidad, id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_indice_nacionalidades_id ON indice_nacionalidades(id);"
+        )
+        self._conexion.commit()
+
+    @property
+    def _canonicas(self):
+        #La lista de nacionalidades se importa y normaliza recién al usarla
+        if self._normalizadas is None:
+            nacionalidades = self._lista
+            if nacionalidades is None:
+                from nacionalidad import Nacionalidades
+                nacionalidades = Nacionalidades
+            self._normalizadas = {normalizar(nac): nac for nac in nacionalidades}
+        return self._normalizadas
+
+    def _mencionadas(self, parte):
+        """
+        Nacionalidades de la lista que aparecen en el texto, en orden. Entre
+        las que se solapan gana la de más palabras ("Papua New Guinean" y no
+        "Guinean"). Si las preceden palabras con mayúscula que no forman otra
+        de la lista ("Native American"), se conserva el nombre completo.
+        """
+        if self._por_palabras is None:
+            self._por_palabras = {" ".join(tokenizar(nac)): nac for nac in self._canonicas.values()}
+        palabras = list(re.finditer(r"\w+", parte))
+        claves = [normalizar(palabra.group()) for palabra in palabras]
+        encontradas = {}
+        ocupadas = set()
+        for largo in range(len(palabras), 0, -1):
+            for inicio in range(len(palabras) - largo + 1):
+                fin = inicio + largo
+                if ocupadas.intersection(range(inicio, fin)):
+                    continue
+                canonica = self._por_palabras.get(" ".join(claves[inicio:fin]))
+                if canonica is not None:
+                    encontradas[inicio] = (fin, canonica)
+                    ocupadas.update(range(inicio, fin))
+        resultado = []
+        for inicio in sorted(encontradas):
+            fin, canonica = encontradas[inicio]
+            primera = inicio
+            while (primera > 0 and primera - 1 not in ocupadas
+                   and palabras[primera - 1].group()[:1].isupper()
+                   and not parte[palabras[primera - 1].end():palabras[primera].start()].strip()):
+                primera -= 1
+            if primera < inicio:
+                canonica = parte[palabras[primera].start():palabras[fin - 1].end()]
+            resultado.append(canonica)
+        return resultado
+
+    def canonizar(self, texto):
+        """
+        Convierte el texto de artistNationality en la lista de nacionalidades
+        canónicas que menciona ("French, born Germany" -> ["French"],
+        "American and British" -> ["American", "British"]).
+        Los valores que no están en la lista se conservan tal cual.
+        """
+        resultado = []
+        for parte in str(texto or "").split("|"):
+            clave = normalizar(parte).strip()
+            if not clave:
+                continue
+            canonica = self._canonicas.get(clave)
+            if canonica is not None:
+                mencionadas = [canonica]
+            else:
+                mencionadas = self._mencionadas(parte) or [parte.strip().title()]
+            for canonica in mencionadas:
+                if canonica not in resultado:
+                    resultado.append(canonica)
+        return resultado
+
+    def registrar_varios(self, datos):
+        #Agrega (o corrige) las obras bajo sus nacionalidades canónicas
+        nuevas = {}
+        for data in datos:
+            obj_id = data.get("objectID")
+            if obj_id:
+                nuevas[int(obj_id)] = set(self.canonizar(data.get("artistNationality")))
+        if not nuevas:
+            return
+        with self._lock:
+            anteriores = defaultdict(set)
+            for lote in en_lotes(nuevas):
+                for obj_id, nacionalidad in self._conexion.execute(
+                        "SELECT id, nacionalidad FROM indice_nacionalidades "
+                        f"WHERE id IN ({', '.join('?' * len(lote))})", lote):
+                    anteriores[obj_id].add(nacionalidad)
+            cambiadas = {obj_id: nacionalidades for obj_id, nacionalidades in nuevas.items()
+                         if anteriores.get(obj_id, set()) != nacionalidades}
+            if not cambiadas:
+                return
+            self._conexion.executemany(
+                "DELETE FROM indice_nacionalidades WHERE id = ?",
+                [(obj_id,) for obj_id in cambiadas if obj_id in anteriores]
+            )
+            self._conexion.executemany(
+                "INSERT OR IGNORE INTO indice_nacionalidades VALUES (?, ?)",
+                [(nacionalidad, obj_id) for obj_id, nacionalidades in cambiadas.items()
+                 for nacionalidad in nacionalidades]
+            )
+            self._conexion.commit()
+            for obj_id, nacionalidades in cambiadas.items():
+                for nacionalidad in nacionalidades | anteriores.get(obj_id, set()):
+                    self._ordenados.pop(nacionalidad, None)
+
+    def eliminar_varios(self, ids):
+        filas = [(int(obj_id),) for obj_id in ids]
+        with self._lock:
+            self._conexion.executemany("DELETE FROM indice_nacionalidades WHERE id = ?", filas)
+            self._conexion.commit()
+            #No se sabe a qué nacionalidades pertenecían: se descartan todas las listas
+            self._ordenados.clear()
+
+    def _ids_de(self, nacionalidades):
+        #IDs (ordenados, sin repetir) de las obras de cualquiera de las nacionalidades
+        filas = self._conexion.execute(
+            "SELECT DISTINCT id FROM indice_nacionalidades "
+            f"WHERE nacionalidad IN ({', '.join('?' * len(nacionalidades))}) ORDER BY id",
+            list(nacionalidades)
+        )
+        return [fila[0] for fila in filas]
+
+    def ids(self, nacionalidad):
+        """
+        Retorna los IDs (ordenados) de las obras de la nacionalidad. Si el
+        texto no es una nacionalidad conocida, se buscan las que lo contengan.
+        """
+        with self._lock:
+            canonica = self._canonicas.get(normalizar(nacionalidad).strip(), nacionalidad)
+            if canonica not in self._ordenados:
+                ids = self._ids_de([canonica])
+                if not ids:
+                    texto = normalizar(nacionalidad).strip()
+                    parecidas = [nac for nac in self.conteos() if texto and texto in normalizar(nac)]
+                    return self._ids_de(parecidas) if parecidas else []
+                self._ordenados[canonica] = ids
+            return self._ordenados[canonica]
+
+    def conteos(self):
+        #Cantidad de obras conocidas por nacionalidad
+        with self._lock:
+            return dict(self._conexion.execute(
+                "SELECT nacionalidad, COUNT(*) FROM indice_nacionalidades GROUP BY nacionalidad"
+            ))
+
+
+class IndiceArtistas:
+    """
+    Nombres de artistas conocidos, con un índice de trigramas sobre sus
+    palabras sin acentos. Sugiere el nombre correcto aunque el texto buscado
+    tenga errores de tipeo ("Velaskez" -> "Diego Velázquez") sin consultar
+    la API. En memoria solo se guardan los nombres; las obras de cada
+    artista se consultan al índice de obras. Los nombres se leen del índice
+    recién al primer uso (o al llamar a `cargar`, por ejemplo en segundo plano).
+    """
+
+    def __init__(self, indice):
+        self._indice = indice
+        self._cargado = False
+        self._nombres = set()
+        self._nombres_por_palabra = defaultdict(set)
+        self._trigramas = defaultdict(set)
+        self._cantidad_trigramas = {}
+        self._lock = threading.RLock()
+
+    def cargar(self):
+        #Construye el índice de trigramas con los artistas del índice de obras
+        with self._lock:
+            if self._cargado:
+                return
+            for nombre in self._indice.cantidades_por_artista():
+                self._agregar(nombre)
+            self._cargado = True
+
+    @staticmethod
+    def _trigramas_de(palabra):
+        relleno = f"  {palabra} "
+        return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+    def _agregar(self, nombre):
+        nombre = (nombre or "").strip()
+        if not nombre or nombre in self._nombres:
+            return
+        for palabra in tokenizar(nombre):
+            if palabra not in self._cantidad_trigramas:
+                trigramas = self._trigramas_de(palabra)
+                self._cantidad_trigramas[palabra] = len(trigramas)
+                for trigrama in trigramas:
+                    self._trigramas[trigrama].add(palabra)
+            self._nombres_por_palabra[palabra].add(nombre)
+        self._nombres.add(nombre)
+
+    def _quitar(self, nombre):
+        self._nombres.discard(nombre)
+        for palabra in tokenizar(nombre):
+            self._nombres_por_palabra[palabra].discard(nombre)
+
+    def registrar_varios(self, datos):
+        with self._lock:
+            if not self._cargado:
+                #Los nombres nuevos ya estarán en el índice de obras al cargar
+                return
+            for data in datos:
+                self._agregar(data.get("artistDisplayName"))
+
+    def ids(self, nombre):
+        #IDs (ordenados) de las obras conocidas del artista con ese nombre exacto
+        return self._indice.ids_de_artista(nombre)
+
+    def _palabras_parecidas(self, token, umbral):
+        #Palabras del vocabulario cuya similitud de trigramas (Dice) con
+        #`token` supera el umbral; un prefijo exacto cuenta como 0.9
+        trigramas = self._trigramas_de(token)
+        comunes = Counter(chain.from_iterable(self._trigramas.get(t, ()) for t in trigramas))
+        #Con menos trigramas en común que esto, la similitud no llega al umbral
+        minimo = umbral * len(trigramas) / (2 - umbral)
+        parecidas = {}
+        for palabra, cantidad in comunes.items():
+            if cantidad < minimo and not palabra.startswith(token):
+                continue
+            similitud = 2 * cantidad / (len(trigramas) + self._cantidad_trigramas[palabra])
+            if palabra.startswith(token):
+                similitud = max(similitud, 0.9)
+            if similitud >= umbral:
+                parecidas[palabra] = similitud
+        return parecidas
+
+    def sugerir(self, texto, limite=5, umbral=0.4):
+        """
+        Retorna hasta `limite` tuplas (nombre, puntaje, cantidad de obras),
+        de la más a la menos parecida a `texto`. El puntaje es el promedio,
+        para cada palabra buscada, de su mejor coincidencia en el nombre
+        (1.0 si todas coinciden exactamente).
+        """
+        tokens = tokenizar(texto)
+        if not tokens:
+            return []
+        with self._lock:
+            self.cargar()
+            puntajes = defaultdict(float)
+            for token in tokens:
+                mejores = {}
+                for palabra, similitud in self._palabras_parecidas(token, umbral).items():
+                    for nombre in self._nombres_por_palabra[palabra]:
+                        if similitud > mejores.get(nombre, 0.0):
+                            mejores[nombre] = similitud
+                for nombre, similitud in mejores.items():
+                    puntajes[nombre] += similitud
+            candidatos = heapq.nlargest(limite * 4, puntajes.items(), key=lambda item: item[1])
+            #Los nombres cuyas obras ya no están en el índice (obras retiradas) se descartan
+            cantidades = self._indice.cantidades_por_artista(nombre for nombre, _ in candidatos)
+            for nombre, _ in candidatos:
+                if nombre not in cantidades:
+                    self._quitar(nombre)
+            mejores = heapq.nlargest(
+                limite, [(nombre, puntaje) for nombre, puntaje in candidatos if nombre in cantidades],
+                key=lambda item: (item[1], cantidades[item[0]])
+            )
+            return [(nombre, puntaje / len(tokens), cantidades[nombre])
+                    for nombre, puntaje in mejores]
+
+    def __len__(self):
+        self.cargar()
+        return len(self._nombres)
@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+
+def _habilitar_ansi_windows():
+    #Activa el procesamiento de secuencias ANSI en la consola de Windows 10+
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        salida = kernel32.GetStdHandle(-11)
+        modo = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(salida, ctypes.byref(modo)):
+            kernel32.SetConsoleMode(salida, modo.value | 0x0004)
+    except Exception:
+        pass
+
+
+if os.name == "nt":
+    _habilitar_ansi_windows()
+
+
+def en_segundo_plano(funcion, *args):
+    #Ejecuta la función en un hilo aparte y retorna un Future con su resultado
+    futuro = Future()
+
+    def ejecutar():
+        try:
+            futuro.set_result(funcion(*args))
+        except BaseException as error:
+            futuro.set_exception(error)
+
+    threading.Thread(target=ejecutar, daemon=True).start()
+    return futuro
+
+
+def limpiar_pantalla():
+    #Limpia la consola con secuencias ANSI, sin lanzar un proceso 'clear'/'cls'
+    sys.stdout.write("\033[H\033[2J\033[3J")
+    sys.stdout.flush()
+
+
+class TeclasNoBloqueantes:
+    """
+    Context manager que permite consultar si se presionó una tecla sin
+    bloquear. Si la entrada no es una terminal, nunca informa teclas.
+    """
+
+    def __init__(self):
+        self._configuracion = None
+        self._activo = False
+
+    def __enter__(self):
+        try:
+            self._activo = sys.stdin.isatty()
+        except (AttributeError, ValueError):
+            self._activo = False
+        if self._activo and os.name != "nt":
+            import termios
+            import tty
+            self._configuracion = termios.tcgetattr(sys.stdin)
+            tty.setcbreak(sys.stdin.fileno())
+        return self
+
+    def presionada(self):
+        #Retorna True (y consume la tecla) si hay una tecla pendiente
+        if not self._activo:
+            return False
+        if os.name == "nt":
+            import msvcrt
+            if msvcrt.kbhit():
+                msvcrt.getwch()
+                return True
+            return False
+        import select
+        listo, _, _ = select.select([sys.stdin], [], [], 0)
+        if listo:
+            sys.stdin.read(1)
+            return True
+        return False
+
+    def __exit__(self, *exc):
+        if self._configuracion is not None:
+            import termios
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self._configuracion)
+            self._configuracion = None
+
+
+def esperar_cargando(obtener_estado, dibujar, al_cancelar=None, intervalo=0.1):
+    """
+    Bucle de eventos de la interfaz: mientras los datos se cargan en segundo
+    plano, vuelve a dibujar la pantalla cada vez que llegan resultados nuevos.
+    Cualquier tecla cancela la espera.
+
+    obtener_estado() debe retornar (resultados hasta ahora, completo) y
+    dibujar(resultados, cargando) muestra la pantalla.
+    Retorna (resultados, completo).
+    """
+    ultimo = None
+    with TeclasNoBloqueantes() as teclas:
+        while True:
+            resultados, completo = obtener_estado()
+            if completo:
+                dibujar(resultados, False)
+                return resultados, True
+            if len(resultados) != ultimo:
+                dibujar(resultados, True)
+                ultimo = len(resultados)
+            if teclas.presionada():
+                if al_cancelar:
+                    al_cancelar()
+                dibujar(resultados, False)
+                return resultados, False
+            time.sleep(intervalo)
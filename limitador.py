@@ -0,0 +1,150 @@
+import threading
+import time
+
+
+#Respuestas con las que la API indica que se superó su límite de tasa
+ESTADOS_LIMITE = {403, 429}
+
+
+class LimitadorTasa:
+    """
+    Balde de fichas compartido por todas las solicitudes a la API (datos e
+    imágenes). La tasa se adapta con AIMD: sube de a poco con cada respuesta
+    exitosa y se reduce a la mitad ante un 429/403 o un error de conexión,
+    y un 10% si la latencia se dispara respecto de la habitual. Hasta la
+    primera reducción la tasa crece más rápido (se duplica cada segundo).
+    """
+
+    def __init__(self, tasa_inicial=40.0, tasa_minima=1.0, tasa_maxima=80.0, rafaga=10,
+                 incremento=2.0, factor_latencia=3.0, enfriamiento=1.0):
+        #Solicitudes por segundo permitidas en este momento
+        self.tasa = tasa_inicial
+        self.tasa_minima = tasa_minima
+        self.tasa_maxima = tasa_maxima
+        #Fichas acumulables: cuántas solicitudes pueden salir juntas
+        self.rafaga = rafaga
+        #Aumento de la tasa por segundo mientras todo responde bien
+        self.incremento = incremento
+        #Una latencia media mayor a factor_latencia × la habitual indica saturación
+        self.factor_latencia = factor_latencia
+        #Tiempo mínimo entre reducciones, para que una ráfaga de 429 cuente una vez
+        self.enfriamiento = enfriamiento
+        self.fichas = float(rafaga)
+        self.en_espera = 0
+        self.reducciones = 0
+        self._arranque = True
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._ultima_reduccion = float("-inf")
+        self._latencia_media = None
+        self._latencia_base = None
+        self._lock = threading.Lock()
+
+    def _reponer(self, ahora):
+        self.fichas = min(self.rafaga, self.fichas + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def adquirir(self):
+        #Bloquea hasta que haya una ficha disponible y la consume
+        with self._lock:
+            self.en_espera += 1
+        try:
+            while True:
+                with self._lock:
+                    ahora = time.monotonic()
+                    self._reponer(ahora)
+                    if ahora >= self._pausa_hasta and self.fichas >= 1:
+                        self.fichas -= 1
+                        return
+                    espera = max(self._pausa_hasta - ahora, (1 - self.fichas) / self.tasa)
+                time.sleep(espera)
+        finally:
+            with self._lock:
+                self.en_espera -= 1
+
+    def _reducir(self, ahora, factor):
+        if ahora - self._ultima_reduccion < self.enfriamiento:
+            return
+        self.tasa = max(self.tasa_minima, self.tasa * factor)
+        self._arranque = False
+        self._ultima_reduccion = ahora
+        self.reducciones += 1
+
+    def registrar(self, estado, latencia=None, retry_after=None):
+        """
+        Ajusta la tasa según el resultado de una solicitud. `estado` es el
+        código HTTP (None si no hubo respuesta) y `retry_after` los segundos
+        pedidos por el servidor, durante los cuales nadie envía solicitudes.
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            if estado is None or estado in ESTADOS_LIMITE:
+                if retry_after:
+                    self._pausa_hasta = max(self._pausa_hasta, ahora + retry_after)
+                    self.fichas = 0.0
+                self._reducir(ahora, 0.5)
+                return
+            if estado >= 400:
+                return
+
+            if latencia is not None:
+                if self._latencia_media is None:
+                    self._latencia_media = self._latencia_base = latencia
+                else:
+                    self._latencia_media = 0.8 * self._latencia_media + 0.2 * latencia
+                    #La referencia sube despacio, por si la red se volvió más lenta
+                    self._latencia_base = min(self._latencia_media, self._latencia_base * 1.01)
+                if self._latencia_media > self.factor_latencia * self._latencia_base:
+                    self._reducir(ahora, 0.9)
+                    return
+            aumento = 1.0 if self._arranque else self.incremento / self.tasa
+            self.tasa = min(self.tasa_maxima, self.tasa + aumento)
+
+    def estado(self):
+        #Tasa actual, solicitudes esperando una ficha y reducciones hechas
+        with self._lock:
+            return {
+                "tasa": self.tasa,
+                "en_espera": self.en_espera,
+                "reducciones": self.reducciones,
+                "latencia_media": self._latencia_media,
+            }
+
+
+class LimitadorCompartido(LimitadorTasa):
+    """
+    LimitadorTasa cuyo estado (tasa, fichas, pausas) vive en memoria
+    compartida, para que varios procesos respeten un único presupuesto
+    global de solicitudes por segundo. Debe pasarse a los procesos al
+    crearlos (por ejemplo, en el initializer de un ProcessPoolExecutor).
+    La latencia media se sigue por separado en cada proceso.
+    """
+
+    _COMPARTIDOS = ("tasa", "fichas", "en_espera", "reducciones", "_arranque",
+                    "_ultimo", "_pausa_hasta", "_ultima_reduccion")
+
+    def __init__(self, *args, **kwargs):
+        import multiprocessing
+        self._valores = multiprocessing.RawArray("d", len(self._COMPARTIDOS))
+        super().__init__(*args, **kwargs)
+        self._lock = multiprocessing.Lock()
+
+    def estado(self):
+        estado = super().estado()
+        estado["en_espera"] = int(estado["en_espera"])
+        estado["reducciones"] = int(estado["reducciones"])
+        return estado
+
+
+def _campo_compartido(posicion):
+    def leer(self):
+        return self._valores[posicion]
+
+    def escribir(self, valor):
+        self._valores[posicion] = valor
+
+    return property(leer, escribir)
+
+
+for _posicion, _nombre in enumerate(LimitadorCompartido._COMPARTIDOS):
+    setattr(LimitadorCompartido, _nombre, _campo_compartido(_posicion))
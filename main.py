@@ -1,34 +1,26 @@
-import os
-import requests
+import sys
 import json
+import argparse
+import requests
+import threading
+import time
 
-from PIL import Image
 from departamento import *
 from obra import *
-from nacionalidad import Nacionalidades
-
-
-def guardar_imagen_desde_url(url, nombre_archivo):
-   
-    #Descarga una imagen desde una URL y la guarda en disco.
-    #Retorna la ruta del archivo guardado o None si falla.
-    
-    try:
-        resp = requests.get(url, stream=True)
-        resp.raise_for_status()
-        content_type = resp.headers.get('Content-Type', '')
-        extension = '.png'
-        if 'image/jpeg' in content_type:
-            extension = '.jpg'
-        elif 'image/svg+xml' in content_type:
-            extension = '.svg'
-        nombre_archivo_final = f"{nombre_archivo}{extension}"
-        with open(nombre_archivo_final, 'wb') as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                f.write(chunk)
-        return nombre_archivo_final
-    except Exception:
-        return None
+from concurrencia import obtener_en_paralelo, deduplicar, VueloUnico
+from cache import CacheApi
+from sesion import crear_sesion, solicitar, decodificar_json
+from indice import IndiceObras, IndiceNacionalidades, IndiceArtistas, normalizar
+from almacen import AlmacenObras
+from analitica import AnaliticaColeccion
+from cosecha import cosechar, cosechar_en_paralelo, sincronizar
+from paginacion import ResultadosPaginados
+from imagenes import CacheImagenes
+from metricas import Metricas
+from limitador import LimitadorTasa
+from interfaz import limpiar_pantalla, esperar_cargando, en_segundo_plano
+from exportacion import (consultar, exportar, leer_valores, CONSULTAS, FORMATOS,
+                         CAMPOS_DEPARTAMENTO, CAMPOS_OBRA)
 
 
 class MetroArtApp:
@@ -36,9 +28,97 @@ class MetroArtApp:
 
     API_URL = "https://collectionapi.metmuseum.org/public/collection/v1"
 
+    def __init__(self, max_concurrencia=8, cache=None, indice=None, almacen=None,
+                 nacionalidades=None, api_url=None, limitador=None, artistas=None, analitica=None):
+        #Permite apuntar a otra URL base (por ejemplo, el servidor simulado)
+        if api_url:
+            self.API_URL = api_url
+        #Cantidad máxima de solicitudes simultáneas a la API
+        self.max_concurrencia = max_concurrencia
+        #Caché de respuestas (memoria + disco) compartida por todas las consultas
+        self.cache = cache if cache is not None else CacheApi()
+        #Solicitudes idénticas simultáneas comparten una sola descarga
+        self.vuelos = VueloUnico()
+        #Límite de solicitudes por segundo, compartido por los datos y las imágenes
+        self.limitador = limitador if limitador is not None else LimitadorTasa()
+        #Latencias, códigos de estado y tiempos de cada acción
+        self.metricas = Metricas(self.cache, self.vuelos, self.limitador)
+        #Sesión HTTP con conexiones persistentes, dimensionada según la concurrencia
+        self.sesion = crear_sesion(tamano_pool=max(10, max_concurrencia))
+        #Índice local de todas las obras descargadas, para búsquedas sin red
+        self.indice = indice if indice is not None else IndiceObras()
+        #Índice nacionalidad -> IDs de obras, normalizado contra `Nacionalidades`
+        self.nacionalidades = nacionalidades if nacionalidades is not None else IndiceNacionalidades()
+        #Nombres de artistas conocidos, para sugerir el correcto ante errores de tipeo
+        self.artistas = artistas if artistas is not None else IndiceArtistas(self.indice)
+        #Espejo local de la colección que llena la cosecha
+        self.almacen = almacen if almacen is not None else AlmacenObras()
+        #Conteos por departamento, nacionalidad, clasificación y década del espejo
+        self.analitica = analitica if analitica is not None else AnaliticaColeccion(
+            self.almacen, self.nacionalidades.canonizar
+        )
+        #Imágenes descargadas y sus miniaturas, reutilizadas entre consultas
+        self.imagenes = CacheImagenes(sesion=self.sesion, metricas=self.metricas,
+                                      limitador=self.limitador)
+        #Lista de departamentos que se carga al arrancar (Future) y resultados
+        #de los departamentos más usados, precargados en segundo plano
+        self._departamentos = None
+        self._precargados = {}
+
+    def calentar(self, departamentos_populares=3):
+        """
+        Prepara el arranque interactivo sin demorar el primer menú: pide la
+        lista de departamentos (a la caché o a la API) en segundo plano,
+        arma el índice de nombres de artistas y precarga la primera página
+        de los departamentos más consultados.
+        """
+        self._departamentos = en_segundo_plano(self.obtener_departamentos)
+        en_segundo_plano(self.artistas.cargar)
+        en_segundo_plano(self._precargar_departamentos, self._departamentos_mas_usados(departamentos_populares))
+
+    def _precargar_departamentos(self, departamento_ids):
+        for departamento_id in departamento_ids:
+            resultados = self.obtener_resultados_por_departamento(departamento_id)
+            resultados.precargar(0)
+            self._precargados[departamento_id] = resultados
+
+    def _registrar_uso_departamento(self, departamento_id):
+        #Cuenta cuántas veces se abrió cada departamento, para el calentamiento
+        uso = json.loads(self.almacen.obtener_meta("uso_departamentos", "{}"))
+        uso[str(departamento_id)] = uso.get(str(departamento_id), 0) + 1
+        self.almacen.guardar_meta("uso_departamentos", json.dumps(uso))
+
+    def _departamentos_mas_usados(self, cantidad):
+        uso = json.loads(self.almacen.obtener_meta("uso_departamentos", "{}"))
+        return [int(dep_id) for dep_id, _ in sorted(uso.items(), key=lambda item: -item[1])[:cantidad]]
+
+    def _lista_departamentos(self):
+        #Usa la lista pedida al arrancar; si no la hay o falló, la pide de nuevo
+        if self._departamentos is not None:
+            departamentos = self._departamentos.result()
+            if departamentos:
+                return departamentos
+        self._departamentos = None
+        return self.obtener_departamentos()
+
     def _limpiar_pantalla(self):
         #Limpia la pantalla de la consola
-        os.system('cls' if os.name == 'nt' else 'clear')
+        limpiar_pantalla()
+
+    def _esperar_pagina(self, resultados, pagina, dibujar):
+        """
+        Dibuja la página a medida que llegan sus obras, que se descargan en
+        segundo plano; cualquier tecla cancela la carga. Cuando la página
+        está completa se empieza a precargar la siguiente.
+        """
+        resultados.precargar(pagina)
+        _, completa = esperar_cargando(
+            lambda: resultados.pagina_parcial(pagina),
+            dibujar,
+            al_cancelar=lambda: resultados.cancelar(pagina)
+        )
+        if completa:
+            resultados.precargar(pagina + 1)
 
     def _mostrar_menu(self, title, options):
         #Muestra un menú con título y opciones, y retorna la opción elegida
@@ -51,18 +131,88 @@ class MetroArtApp:
         print("=" * 35)
         return input("Seleccione una opción: ")
 
-    def _obtener_datos_api(self, endpoint, params=None):
+    def _obtener_datos_api(self, endpoint, params=None, usar_cache=True):
         """
         Realiza una solicitud GET a la API del Met y retorna los datos en formato JSON.
+        Las respuestas se sirven desde la caché cuando están vigentes, y las
+        solicitudes iguales que ocurren al mismo tiempo comparten una descarga.
         Si ocurre un error, retorna un diccionario vacío.
         """
+        if usar_cache:
+            datos = self.cache.obtener(endpoint, params)
+            if datos is not None:
+                return datos
+        return self.vuelos.ejecutar(
+            CacheApi.clave(endpoint, params),
+            lambda: self._descargar_datos_api(endpoint, params, usar_cache)
+        )
+
+    def _descargar_datos_api(self, endpoint, params, usar_cache):
+        #Hace la solicitud HTTP, registra sus métricas y guarda la respuesta en caché
         url = f"{self.API_URL}/{endpoint}"
+        reintentos = []
+        esperas = []
+        estado = None
+        tamano = 0
+        inicio = time.perf_counter()
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except (requests.exceptions.RequestException, json.JSONDecodeError):
+            response = solicitar(self.sesion, url, params=params, al_reintentar=reintentos.append,
+                                 limitador=self.limitador, al_esperar=esperas.append)
+            estado = response.status_code
+            tamano = len(response.content)
+            datos = decodificar_json(response.content)
+            if endpoint.startswith("objects/") and isinstance(datos, dict):
+                #Solo se conservan los campos que usan los modelos; el resto del
+                #payload (constituents, tags, additionalImages...) se descarta aquí
+                datos = proyectar(datos, CAMPOS_OBJETO)
+        except requests.exceptions.RequestException as error:
+            if error.response is not None:
+                estado = error.response.status_code
+            return {}
+        except ValueError:
             return {}
+        finally:
+            #La espera por el limitador se registra aparte de la latencia del endpoint
+            espera = sum(esperas)
+            self.metricas.registrar_solicitud(
+                endpoint, time.perf_counter() - inicio - espera, estado, tamano, len(reintentos), espera
+            )
+        if datos and usar_cache:
+            self.cache.guardar(endpoint, params, datos)
+        return datos
+
+    def _obtener_objetos(self, object_ids, mostrar_progreso=False, registrar=True, usar_cache=True,
+                         al_recibir=None, cancelar=None):
+        """
+        Descarga en paralelo los datos de varias obras de la API.
+        Retorna la lista de respuestas en el mismo orden de `object_ids`
+        (sin repetidos, omitiendo las que fallaron) y la cantidad de errores.
+        `al_recibir(data)` se llama con cada respuesta apenas llega y el
+        evento `cancelar` detiene las descargas que aún no empezaron.
+        """
+        object_ids = deduplicar(object_ids)
+        def progreso(completados):
+            if completados % 5 == 0:
+                print(".", end="", flush=True)
+
+        resultados, errores_api = obtener_en_paralelo(
+            lambda obj_id: self._obtener_datos_api(f"objects/{obj_id}", usar_cache=usar_cache),
+            object_ids,
+            max_workers=self.max_concurrencia,
+            al_completar=progreso if mostrar_progreso else None,
+            al_resultado=(lambda _, data: al_recibir(data)) if al_recibir else None,
+            cancelar=cancelar
+        )
+        datos = [data for data in resultados if data]
+        if registrar:
+            self._registrar_obras(datos)
+        return datos, errores_api
+
+    def _registrar_obras(self, datos):
+        #Agrega a los índices locales las obras recién descargadas
+        self.indice.registrar_varios(datos)
+        self.nacionalidades.registrar_varios(datos)
+        self.artistas.registrar_varios(datos)
 
     def obtener_departamentos(self):
         #Obtiene la lista de departamentos disponibles desde la API
@@ -71,26 +221,24 @@ class MetroArtApp:
         return [Departamento.from_json(dep) for dep in departamentos_json]
 
     def obtener_obras_por_departamento(self, departamento_id):
+        #Si el departamento ya fue cosechado, se lista completo desde el espejo local
+        if self.almacen.departamento_completo(departamento_id):
+            obras = self.almacen.obras_de_departamento(departamento_id)
+            return obras, len(obras)
+
         params = {"departmentId": departamento_id, "q": "art"}
         search_results = self._obtener_datos_api("search", params=params)
         object_ids = search_results.get("objectIDs", []) or []
         obras = []
-        errores_api = 0
         limite_obras = 200
         print(f"Cargando las primeras obras. Esto puede tardar unos segundos...")
 
-        for i, obj_id in enumerate(object_ids[:limite_obras]):
+        datos, errores_api = self._obtener_objetos(object_ids[:limite_obras], mostrar_progreso=True)
+        for obj_data in datos:
             try:
-                if (i + 1) % 5 == 0:
-                    print(".", end="", flush=True)
-                obj_data = self._obtener_datos_api(f"objects/{obj_id}")
-                if not obj_data:
-                    errores_api += 1
-                    continue
                 obras.append(Obra.from_json(obj_data))
             except Exception:
                 errores_api += 1
-                continue
 
         print("\n")
         if errores_api > 0:
@@ -98,13 +246,63 @@ class MetroArtApp:
 
         return obras, search_results.get("total", 0)
 
+    def _cargar_obras(self, object_ids, al_llegar=None, cancelar=None):
+        """
+        Retorna (lista de Obra, cantidad de errores) para un grupo de IDs,
+        tomando del índice local las obras conocidas y descargando el resto.
+        Si se indica, `al_llegar(obra)` recibe cada obra apenas está disponible.
+        """
+        locales = {obra.id: obra for obra in self.indice.obras(object_ids)}
+        if al_llegar:
+            for obra in locales.values():
+                al_llegar(obra)
+
+        def recibir(obj_data):
+            try:
+                al_llegar(Obra.from_json(obj_data))
+            except Exception:
+                pass
+
+        datos, errores_api = self._obtener_objetos(
+            [obj_id for obj_id in object_ids if obj_id not in locales],
+            al_recibir=recibir if al_llegar else None,
+            cancelar=cancelar
+        )
+        for obj_data in datos:
+            try:
+                obra = Obra.from_json(obj_data)
+                locales[obra.id] = obra
+            except Exception:
+                errores_api += 1
+        obras = [locales[obj_id] for obj_id in object_ids if obj_id in locales]
+        return obras, errores_api
+
+    def obtener_resultados_por_departamento(self, departamento_id, tamano_pagina=10):
+        """
+        Retorna los resultados del departamento como una secuencia paginada
+        perezosa sobre la lista completa de objectIDs (sin límite de 200).
+        Si el calentamiento ya los precargó, se usan esos resultados.
+        """
+        precargados = self._precargados.pop(departamento_id, None)
+        if precargados is not None and precargados.tamano_pagina == tamano_pagina:
+            return precargados
+        if self.almacen.departamento_completo(departamento_id):
+            obras = self.almacen.obras_de_departamento(departamento_id)
+            return ResultadosPaginados.desde_lista(obras, tamano_pagina)
+
+        params = {"departmentId": departamento_id, "q": "art"}
+        search_results = self._obtener_datos_api("search", params=params)
+        object_ids = search_results.get("objectIDs", []) or []
+        return ResultadosPaginados(object_ids, self._cargar_obras, tamano_pagina)
+
     def buscar_obras_por_departamento(self):
         self._limpiar_pantalla()
         print("=" * 47)
         print("   MetroArt - Búsqueda por Departamento de Obra   ")
         print("=" * 47)
 
-        departamentos = self.obtener_departamentos()
+        with self.metricas.medir_accion("lista_departamentos"):
+            departamentos = self._lista_departamentos()
         if not departamentos:
             print("No se pudieron cargar los departamentos.")
             input("Presione Enter para continuar...")
@@ -128,33 +326,48 @@ class MetroArtApp:
                 print("Entrada inválida. Intente de nuevo.")
 
         print(f"\nBuscando obras en el departamento: {departamento.nombre}...\n")
-        obras, total = self.obtener_obras_por_departamento(departamento.id)
-        if not obras:
+        self._registrar_uso_departamento(departamento.id)
+        inicio = time.perf_counter()
+        resultados = self.obtener_resultados_por_departamento(departamento.id)
+        if not len(resultados):
             print("No se encontraron obras.")
             input("Presione Enter para continuar...")
             return
 
-        print(f"Se encontraron {len(obras)} de {total} obras:\n")
-        pagina = 0
-        while True:
+        def dibujar(obras, cargando):
             self._limpiar_pantalla()
-            print(f"Obras del departamento {departamento.nombre} (página {pagina+1}/{(len(obras)-1)//10+1})\n")
-            for obra in obras[pagina*10:(pagina+1)*10]:
+            print(f"Obras del departamento {departamento.nombre} "
+                  f"(página {pagina+1}/{resultados.total_paginas}, {len(resultados)} obras)\n")
+            for obra in obras:
                 print(f"ID Obra: {obra.id}")
                 print(f"Título: {obra.titulo}")
                 print(f"Autor: {obra.artista}")
                 print("---")
+            if cargando:
+                print("Cargando obras... (presione cualquier tecla para cancelar)")
+                return
+            if resultados.errores > 0:
+                print(f"(Se omitieron {resultados.errores} obras por problemas de conexión con la API)")
             print("N: Siguiente página | P: Página anterior | 0: Salir")
-            opcion = input("Opción: ").strip().lower()
-            if opcion == 'n' and (pagina+1)*10 < len(obras):
-                pagina += 1
-            elif opcion == 'p' and pagina > 0:
-                pagina -= 1
-            elif opcion == '0':
-                break
-            else:
-                print("Opción inválida.")
-                input("Presione Enter para continuar...")
+
+        pagina = 0
+        try:
+            self._esperar_pagina(resultados, pagina, dibujar)
+            self.metricas.registrar_accion("carga_departamento", time.perf_counter() - inicio)
+            while True:
+                opcion = input("Opción: ").strip().lower()
+                if opcion == 'n' and pagina + 1 < resultados.total_paginas:
+                    pagina += 1
+                elif opcion == 'p' and pagina > 0:
+                    pagina -= 1
+                elif opcion == '0':
+                    break
+                else:
+                    print("Opción inválida.")
+                    input("Presione Enter para continuar...")
+                self._esperar_pagina(resultados, pagina, dibujar)
+        finally:
+            resultados.cerrar()
 
     def obtener_nacionalidades_disponibles(self, obras):
         nacionalidades = set()
@@ -165,34 +378,38 @@ class MetroArtApp:
                     nacionalidades.add(nacionalidad)
         return sorted(nacionalidades)
 
-    def obtener_obras_por_nacionalidad(self, nacionalidad):
+    def _ids_por_nacionalidad(self, nacionalidad):
+        #Consulta el índice de nacionalidades. Si todavía no conoce ninguna
+        #obra de esa nacionalidad, lo alimenta con las obras destacadas de la API
+        object_ids = self.nacionalidades.ids(nacionalidad)
+        if object_ids:
+            return object_ids
         search_results = self._obtener_datos_api("search", params={"q": "art", "isHighlight": True})
-        object_ids = search_results.get("objectIDs", []) or []
-        obras = []
-        errores_api = 0
-        for obj_id in object_ids[:30]:
-            try:
-                obj_data = self._obtener_datos_api(f"objects/{obj_id}")
-                if not obj_data:
-                    errores_api += 1
-                    continue
-                if obj_data.get('artistNationality'):
-                    obra = Obra.from_json(obj_data)
-                    if obra.nacionalidad and nacionalidad.lower() in obra.nacionalidad.lower():
-                        obras.append(obra)
-            except Exception:
-                errores_api += 1
-                continue
+        destacadas = search_results.get("objectIDs", []) or []
+        faltantes = [obj_id for obj_id in destacadas[:30] if obj_id not in self.indice]
+        _, errores_api = self._obtener_objetos(faltantes)
+        if errores_api > 0:
+            print(f"(Se omitieron {errores_api} obras por problemas de conexión con la API)")
+        return self.nacionalidades.ids(nacionalidad)
+
+    def obtener_obras_por_nacionalidad(self, nacionalidad):
+        obras, errores_api = self._cargar_obras(self._ids_por_nacionalidad(nacionalidad))
         if errores_api > 0:
             print(f"(Se omitieron {errores_api} obras por problemas de conexión con la API)")
         return obras
 
+    def obtener_resultados_por_nacionalidad(self, nacionalidad, tamano_pagina=5):
+        #Resultados paginados: solo se cargan las obras de la página mostrada
+        return ResultadosPaginados(self._ids_por_nacionalidad(nacionalidad), self._cargar_obras, tamano_pagina)
+
     def buscar_obras_por_nacionalidad(self):
         self._limpiar_pantalla()
         print("=" * 55)
         print("   MetroArt - Búsqueda por Nacionalidad del Autor   ")
         print("=" * 55)
 
+        #La lista completa de nacionalidades se importa solo al entrar aquí
+        from nacionalidad import Nacionalidades
         items_por_pagina = 15
         pagina_actual = 0
         total_paginas = (len(Nacionalidades) + items_por_pagina - 1) // items_por_pagina
@@ -245,62 +462,82 @@ class MetroArtApp:
 
     def _mostrar_resultados_nacionalidad(self, nacionalidad):
         print(f"\nBuscando obras de artistas {nacionalidad}...")
-        obras = self.obtener_obras_por_nacionalidad(nacionalidad)
-        if not obras:
+        inicio = time.perf_counter()
+        resultados = self.obtener_resultados_por_nacionalidad(nacionalidad)
+        if not len(resultados):
             print(f"\nNo se encontraron obras de artistas {nacionalidad}.")
             input("Presione Enter para continuar...")
             return
 
-        pagina = 0
-        total_paginas = (len(obras) + 4) // 5
-        while True:
+        def dibujar(obras, cargando):
             self._limpiar_pantalla()
             print("=" * 55)
             print(f"Obras de artistas {nacionalidad} (Página {pagina+1}/{total_paginas})")
             print("=" * 55)
-            for obra in obras[pagina*5: (pagina+1)*5]:
+            for obra in obras:
                 print(f"\nID Obra: {obra.id}")
                 print(f"Título: {obra.titulo}")
                 print(f"Autor: {obra.artista}")
                 print(f"Nacionalidad: {obra.nacionalidad}")
                 print("-" * 30)
+            if cargando:
+                print("\nCargando obras... (presione cualquier tecla para cancelar)")
+                return
+            if resultados.errores > 0:
+                print(f"(Se omitieron {resultados.errores} obras por problemas de conexión con la API)")
             print("\nOpciones:")
-            print(" N - Página siguiente" if (pagina+1)*5 < len(obras) else "")
+            print(" N - Página siguiente" if pagina + 1 < total_paginas else "")
             print(" P - Página anterior" if pagina > 0 else "")
             print(" 0 - Volver al listado de nacionalidades")
 
-            opcion = input("\nSelección: ").strip().lower()
-            if opcion == 'n' and (pagina+1)*5 < len(obras):
-                pagina += 1
-            elif opcion == 'p' and pagina > 0:
-                pagina -= 1
-            elif opcion == '0':
-                break
-            else:
-                print("Opción no válida")
-                input("Presione Enter para continuar...")
+        pagina = 0
+        total_paginas = resultados.total_paginas
+        try:
+            self._esperar_pagina(resultados, pagina, dibujar)
+            self.metricas.registrar_accion("busqueda_nacionalidad", time.perf_counter() - inicio)
+            while True:
+                opcion = input("\nSelección: ").strip().lower()
+                if opcion == 'n' and pagina + 1 < total_paginas:
+                    pagina += 1
+                elif opcion == 'p' and pagina > 0:
+                    pagina -= 1
+                elif opcion == '0':
+                    break
+                else:
+                    print("Opción no válida")
+                    input("Presione Enter para continuar...")
+                self._esperar_pagina(resultados, pagina, dibujar)
+        finally:
+            resultados.cerrar()
 
 
-    def obtener_obras_por_autor(self, nombre_autor):
-        #Obtiene obras filtradas por nombre del artista
+    def obtener_obras_por_autor(self, nombre_autor, cancelar=None):
+        #Obtiene obras filtradas por nombre del artista (sin distinguir acentos).
+        #El evento `cancelar` detiene las descargas que aún no empezaron
         params = {
             "q": nombre_autor,
-            "isHighlight": True  
+            "artistOrCulture": True
         }
+        buscado = normalizar(nombre_autor)
+        #Primero responde con el índice local: las obras conocidas del artista
+        #elegido (nombre exacto) y las que coinciden con las palabras buscadas
+        conocidas = sorted(set(self.artistas.ids(nombre_autor)) |
+                           set(self.indice.buscar(nombre_autor, "artista")))
+        obras = [obra for obra in self.indice.obras(conocidas) if buscado in normalizar(obra.artista)]
+        if obras and self.almacen.departamento_completo(0):
+            #Con la colección completa en el espejo, el índice ya tiene todas sus obras
+            return obras
+
+        #La API solo completa las obras que el índice todavía no conoce
         search_results = self._obtener_datos_api("search", params=params)
         object_ids = search_results.get("objectIDs", []) or []
-        obras = []
-        errores_api = 0
-        
-        for obj_id in object_ids[:30]:  
+        faltantes = [obj_id for obj_id in object_ids if obj_id not in self.indice][:30]
+        datos, errores_api = self._obtener_objetos(faltantes, cancelar=cancelar)
+
+        for obj_data in datos:
             try:
-                obj_data = self._obtener_datos_api(f"objects/{obj_id}")
-                if not obj_data:
-                    errores_api += 1
-                    continue
-                    
                 obra = Obra.from_json(obj_data)
-                if obra.artista and nombre_autor.lower() in obra.artista.lower():
+                if obra.artista and buscado in normalizar(obra.artista):
                     obras.append(obra)
             except Exception:
                 errores_api += 1
@@ -311,6 +548,25 @@ class MetroArtApp:
         
         return obras
 
+    def _elegir_artista(self, nombre_autor):
+        """
+        Busca nombres parecidos en el índice de artistas (sin usar la red).
+        Si el texto no coincide con un nombre conocido, ofrece elegir uno de
+        los sugeridos; retorna el nombre elegido o el texto tal cual.
+        """
+        sugerencias = self.artistas.sugerir(nombre_autor)
+        if not sugerencias:
+            return nombre_autor
+        if normalizar(sugerencias[0][0]) == normalizar(nombre_autor):
+            return sugerencias[0][0]
+        print("\n¿A cuál de estos artistas se refiere?\n")
+        for i, (nombre, _, cantidad) in enumerate(sugerencias, start=1):
+            print(f"{i}. {nombre} ({cantidad} obras conocidas)")
+        eleccion = input("\nNúmero del artista (Enter para buscar el texto tal cual): ").strip()
+        if eleccion.isdigit() and 1 <= int(eleccion) <= len(sugerencias):
+            return sugerencias[int(eleccion) - 1][0]
+        return nombre_autor
+
     def buscar_obras_por_autor(self):
         self._limpiar_pantalla()
         print("=" * 55)
@@ -321,8 +577,23 @@ class MetroArtApp:
             print("Debe ingresar un nombre de autor.")
             input("Presione Enter para continuar...")
             return
-        print(f"\nBuscando obras de {nombre_autor}...\n")
-        obras = self.obtener_obras_por_autor(nombre_autor)
+        nombre_autor = self._elegir_artista(nombre_autor)
+        inicio = time.perf_counter()
+        cancelar = threading.Event()
+        futuro = en_segundo_plano(self.obtener_obras_por_autor, nombre_autor, cancelar)
+
+        def dibujar_espera(_, cargando):
+            if cargando:
+                print(f"\nBuscando obras de {nombre_autor}... (presione cualquier tecla para cancelar)\n")
+
+        _, completo = esperar_cargando(lambda: ([], futuro.done()), dibujar_espera,
+                                       al_cancelar=cancelar.set)
+        if not completo:
+            print("Búsqueda cancelada.")
+            input("Presione Enter para continuar...")
+            return
+        obras = futuro.result()
+        self.metricas.registrar_accion("busqueda_autor", time.perf_counter() - inicio)
         if not obras:
             print(f"No se encontraron obras de {nombre_autor}.")
             input("Presione Enter para continuar...")
@@ -358,19 +629,31 @@ class MetroArtApp:
         print("=" * 39)
 
         object_id = input("Ingrese el ID de la obra: ").strip()
-        if not object_id.isdigit():
+        if not object_id.isdecimal():
             print("El ID debe ser numérico.")
             input("Presione Enter para continuar...")
             return
+        object_id = int(object_id)
 
         print("\nConsultando detalles...\n")
-        data = self._obtener_datos_api(f"objects/{object_id}")
-        if not data:
-            print("No se encontraron datos para ese ID.")
-            input("Presione Enter para continuar...")
-            return
+        inicio = time.perf_counter()
+        #Un ID que no entra en un entero de SQLite (64 bits) no está en el espejo
+        detalle = self.almacen.obtener_detalle(object_id) if object_id < 2 ** 63 else None
+        if detalle is None:
+            data = self._obtener_datos_api(f"objects/{object_id}")
+            if not data:
+                print("No se encontraron datos para ese ID.")
+                input("Presione Enter para continuar...")
+                return
+
+            self._registrar_obras([data])
+            detalle = DetalleObra.from_json(data)
+        self.metricas.registrar_accion("detalle_obra", time.perf_counter() - inicio)
+
+        if detalle.url_imagen:
+            #La imagen se descarga mientras el usuario lee los detalles
+            self.imagenes.precargar(detalle.id, CacheImagenes.elegir_url(detalle))
 
-        detalle = DetalleObra.from_json(data)
         print(f"ID:            {detalle.id}")
         print(f"Título:        {detalle.titulo}")
         print(f"Nombre artista:{detalle.artista}")
@@ -385,10 +668,14 @@ class MetroArtApp:
         if detalle.url_imagen:
             ver = input("¿Abrir la imagen en una ventana? (S/N): ").strip().lower()
             if ver == 's':
-                ruta = guardar_imagen_desde_url(detalle.url_imagen, f"obra_{detalle.id}")
+                inicio = time.perf_counter()
+                ruta = self.imagenes.obtener(detalle.id, CacheImagenes.elegir_url(detalle))
                 if ruta:
                     try:
+                        from PIL import Image
+                        ruta = self.imagenes.miniatura(ruta)
                         Image.open(ruta).show()
+                        self.metricas.registrar_accion("abrir_imagen", time.perf_counter() - inicio)
                         print(f"Imagen abierta: {ruta}")
                     except Exception:
                         print("No fue posible abrir la imagen descargada.")
@@ -399,11 +686,91 @@ class MetroArtApp:
 
         input("\nPresione Enter para volver al menú...")
 
+    def mostrar_estadisticas(self):
+        #Muestra las métricas de red y de las acciones, y permite exportarlas
+        self._limpiar_pantalla()
+        resumen = self.metricas.resumen()
+        print("=" * 55)
+        print("   MetroArt - Estadísticas de rendimiento   ")
+        print("=" * 55)
+        print(f"{'Endpoint':<16}{'Solic.':>7}{'Error':>6}{'Reint.':>7}{'p50 ms':>8}{'p95 ms':>8}"
+              f"{'Esp. ms':>8}{'KB':>9}")
+        for nombre, m in resumen["endpoints"].items():
+            print(f"{nombre:<16}{m['solicitudes']:>7}{m['errores']:>6}{m['reintentos']:>7}"
+                  f"{m['latencia_p50'] * 1000:>8.0f}{m['latencia_p95'] * 1000:>8.0f}"
+                  f"{m['espera_limitador_media'] * 1000:>8.0f}{m['bytes'] / 1024:>9.1f}")
+        if not resumen["endpoints"]:
+            print("(Todavía no se hicieron solicitudes a la API)")
+        print("-" * 55)
+        for nombre, a in resumen["acciones"].items():
+            print(f"{nombre:<24} {a['veces']:>3} veces, media {a['tiempo_medio']:.2f}s, "
+                  f"última {a['ultimo']:.2f}s")
+        cache = resumen["cache"]
+        print("-" * 55)
+        print(f"Caché: {cache['hits_memoria']} aciertos en memoria, {cache['hits_disco']} en disco, "
+              f"{cache['fallos']} fallos ({cache['tasa_aciertos']:.0%} de aciertos)")
+        print(f"Solicitudes resueltas por otra descarga en curso: {resumen['solicitudes_coalescidas']}")
+        limitador = resumen["limitador"]
+        print(f"Límite de tasa: {limitador['tasa']:.1f} solicitudes/s, {limitador['en_espera']} en espera, "
+              f"{limitador['reducciones']} reducciones por saturación")
+        print("=" * 55)
+
+        opcion = input("\nExportar a J: JSON | C: CSV | Enter: volver: ").strip().lower()
+        if opcion == 'j':
+            print(f"Guardado en {self.metricas.exportar_json('metroart_metricas.json')}")
+            input("Presione Enter para continuar...")
+        elif opcion == 'c':
+            print(f"Guardado en {self.metricas.exportar_csv('metroart_metricas.csv')}")
+            input("Presione Enter para continuar...")
+
+    def mostrar_analitica(self):
+        #Resumen de las obras del espejo local, agrupadas de varias formas
+        self._limpiar_pantalla()
+        with self.metricas.medir_accion("analitica"):
+            self.analitica.actualizar()
+            resumen = self.analitica.resumen(limite=8)
+            histograma = self.analitica.histograma("decada_creacion")
+        print("=" * 55)
+        print("   MetroArt - Estadísticas de la colección   ")
+        print("=" * 55)
+        if not resumen["departamento"]:
+            print("El espejo local está vacío. Descargue obras con 'python main.py harvest'.")
+            input("\nPresione Enter para continuar...")
+            return
+
+        titulos = {
+            "departamento": "Obras por departamento",
+            "nacionalidad": "Obras por nacionalidad del autor",
+            "clasificacion": "Obras por clasificación",
+            "decada_nacimiento": "Décadas de nacimiento de los autores",
+            "decada_muerte": "Décadas de muerte de los autores",
+        }
+        for dimension, titulo in titulos.items():
+            print(f"\n{titulo}:")
+            for valor, cantidad in resumen[dimension]:
+                print(f"  {valor:<40} {cantidad:>7}")
+
+        #Las décadas de creación se agrupan por siglo para que entren en pantalla
+        por_siglo = {}
+        for decada, cantidad in histograma:
+            siglo = decada // 100 * 100
+            por_siglo[siglo] = por_siglo.get(siglo, 0) + cantidad
+        if por_siglo:
+            print("\nObras por siglo de creación:")
+            maximo = max(por_siglo.values())
+            for siglo, cantidad in sorted(por_siglo.items()):
+                barra = "#" * max(1, round(30 * cantidad / maximo))
+                print(f"  {siglo:>6}s {cantidad:>7} {barra}")
+        input("\nPresione Enter para continuar...")
+
     def run(self):
+        self.calentar()
         while True:
             main_options = {
                 '1': "Búsqueda de obras",
                 '2': "Mostrar detalles de una obra",
+                '3': "Estadísticas de rendimiento",
+                '4': "Estadísticas de la colección",
                 '0': "Salir"
             }
             opcion = self._mostrar_menu("MetroArt - Menú Principal", main_options)
@@ -431,6 +798,10 @@ class MetroArtApp:
                         input("Presione Enter para continuar...")
             elif opcion == '2':
                 self.mostrar_detalles_de_una_obra()
+            elif opcion == '3':
+                self.mostrar_estadisticas()
+            elif opcion == '4':
+                self.mostrar_analitica()
             elif opcion == '0':
                 self._limpiar_pantalla()
                 print("Saliendo del sistema MetroArt. ¡Hasta luego!")
@@ -440,6 +811,76 @@ class MetroArtApp:
                 input("Presione Enter para continuar...")
 
 
+def ejecutar_comando(argv):
+    #Modo no interactivo: python main.py harvest [--department ID] | sync [--desde FECHA]
+    #                     | export CONSULTA [VALORES...] [-o ARCHIVO]
+    parser = argparse.ArgumentParser(prog="main.py", description="MetroArt sin menús")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    harvest = subparsers.add_parser("harvest", help="Descarga obras al espejo local")
+    harvest.add_argument("--department", "--departamento", dest="departamento", type=int,
+                         help="ID del departamento (por defecto, toda la colección)")
+    harvest.add_argument("--concurrencia", type=int, default=8,
+                         help="Solicitudes simultáneas a la API")
+    harvest.add_argument("--lote", type=int, default=200,
+                         help="Obras por lote entre cada punto de control")
+    harvest.add_argument("--procesos", type=int, default=1,
+                         help="Procesos que descargan en paralelo (cada uno con su pool de conexiones)")
+    harvest.add_argument("--tasa-maxima", type=float, default=80.0,
+                         help="Solicitudes por segundo permitidas entre todos los procesos")
+
+    sync = subparsers.add_parser("sync", help="Actualiza el espejo local con los cambios de la API")
+    sync.add_argument("--desde", help="Fecha AAAA-MM-DD (por defecto, la última sincronización)")
+    sync.add_argument("--concurrencia", type=int, default=8,
+                      help="Solicitudes simultáneas a la API")
+    sync.add_argument("--lote", type=int, default=200,
+                      help="Obras por lote")
+
+    export = subparsers.add_parser("export", help="Exporta resultados a JSONL, CSV o Parquet")
+    export.add_argument("consulta", choices=CONSULTAS)
+    export.add_argument("valores", nargs="*",
+                        help="IDs de departamento, nombres de autores o nacionalidades")
+    export.add_argument("--archivo", help="Archivo con un valor por línea (p. ej. muchos autores)")
+    export.add_argument("-o", "--salida", default="-",
+                        help="Archivo de salida (por defecto, la salida estándar)")
+    export.add_argument("--formato", choices=FORMATOS,
+                        help="Por defecto se deduce de la extensión de la salida")
+    export.add_argument("--concurrencia", type=int, default=8,
+                        help="Solicitudes simultáneas a la API")
+    export.add_argument("--simultaneas", type=int, default=4,
+                        help="Valores de la consulta procesados a la vez")
+
+    args = parser.parse_args(argv)
+    if args.comando == "harvest":
+        app = MetroArtApp(max_concurrencia=args.concurrencia,
+                          limitador=LimitadorTasa(tasa_maxima=args.tasa_maxima))
+        if args.procesos > 1:
+            cosechar_en_paralelo(app, args.departamento, procesos=args.procesos,
+                                 tasa_maxima=args.tasa_maxima, tamano_lote=args.lote)
+        else:
+            cosechar(app, args.departamento, tamano_lote=args.lote)
+    elif args.comando == "sync":
+        app = MetroArtApp(max_concurrencia=args.concurrencia)
+        sincronizar(app, args.desde, tamano_lote=args.lote)
+    elif args.comando == "export":
+        valores = list(args.valores)
+        if args.archivo:
+            valores += leer_valores(args.archivo)
+        if args.consulta != "departamentos" and not valores:
+            parser.error(f"la consulta '{args.consulta}' necesita al menos un valor")
+        app = MetroArtApp(max_concurrencia=args.concurrencia)
+        campos = CAMPOS_DEPARTAMENTO if args.consulta == "departamentos" else CAMPOS_OBRA
+        filas = consultar(app, args.consulta, valores, simultaneas=args.simultaneas)
+        try:
+            cantidad = exportar(filas, args.salida, args.formato, campos)
+        except (ValueError, RuntimeError) as error:
+            parser.error(str(error))
+        print(f"{cantidad} filas exportadas", file=sys.stderr)
+
+
 if __name__ == "__main__":
-    app = MetroArtApp()
-    app.run()
+    if len(sys.argv) > 1:
+        ejecutar_comando(sys.argv[1:])
+    else:
+        app = MetroArtApp()
+        app.run()
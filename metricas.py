@@ -0,0 +1,157 @@
+import csv
+import json
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+
+#Límites superiores (segundos) de los baldes del histograma de latencias
+LIMITES_HISTOGRAMA = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+def agrupar_endpoint(endpoint):
+    #"objects/436535" -> "objects/{id}", para agrupar las métricas por tipo
+    return re.sub(r"/\d+$", "/{id}", endpoint)
+
+
+def percentil(valores, p):
+    #Percentil p (0-100) por el método del rango más cercano
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class _MetricasEndpoint:
+
+    def __init__(self):
+        self.solicitudes = 0
+        self.errores = 0
+        self.reintentos = 0
+        self.bytes = 0
+        self.tiempo_total = 0.0
+        #Tiempo esperando turno en el limitador de tasa (no cuenta como latencia)
+        self.espera_limitador = 0.0
+        self.estados = Counter()
+        self.histograma = [0] * len(LIMITES_HISTOGRAMA)
+        self.muestras = deque(maxlen=5000)
+
+    def resumen(self):
+        return {
+            "solicitudes": self.solicitudes,
+            "errores": self.errores,
+            "reintentos": self.reintentos,
+            "bytes": self.bytes,
+            "latencia_media": self.tiempo_total / self.solicitudes if self.solicitudes else 0.0,
+            "latencia_p50": percentil(self.muestras, 50),
+            "latencia_p95": percentil(self.muestras, 95),
+            "latencia_max": max(self.muestras, default=0.0),
+            "espera_limitador_media": self.espera_limitador / self.solicitudes if self.solicitudes else 0.0,
+            "estados": {str(estado): n for estado, n in sorted(self.estados.items(), key=str)},
+            "histograma": {
+                (f"<={limite}s" if limite != float("inf") else f">{LIMITES_HISTOGRAMA[-2]}s"): n
+                for limite, n in zip(LIMITES_HISTOGRAMA, self.histograma)
+            },
+        }
+
+
+class Metricas:
+    """
+    Registro de la actividad de red de la aplicación: latencia por endpoint,
+    códigos de estado, reintentos, bytes transferidos, aciertos de caché y
+    duración de cada acción del menú.
+    """
+
+    def __init__(self, cache=None, vuelos=None, limitador=None):
+        self.cache = cache
+        self.vuelos = vuelos
+        self.limitador = limitador
+        self.inicio = time.time()
+        self._endpoints = defaultdict(_MetricasEndpoint)
+        self._acciones = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def registrar_solicitud(self, endpoint, segundos, estado=None, bytes_transferidos=0, reintentos=0,
+                            espera_limitador=0.0):
+        #estado None indica que no hubo respuesta (error de conexión). `segundos`
+        #no debe incluir la espera del limitador, que se informa aparte
+        with self._lock:
+            metricas = self._endpoints[agrupar_endpoint(endpoint)]
+            metricas.solicitudes += 1
+            metricas.tiempo_total += segundos
+            metricas.espera_limitador += espera_limitador
+            metricas.bytes += bytes_transferidos
+            metricas.reintentos += reintentos
+            metricas.estados[estado if estado is not None else "sin respuesta"] += 1
+            if estado is None or estado >= 400:
+                metricas.errores += 1
+            metricas.histograma[bisect_left(LIMITES_HISTOGRAMA, segundos)] += 1
+            metricas.muestras.append(segundos)
+
+    def latencias(self):
+        #Todas las latencias recientes, sin distinguir endpoint
+        with self._lock:
+            return [latencia for m in self._endpoints.values() for latencia in m.muestras]
+
+    def registrar_accion(self, nombre, segundos):
+        with self._lock:
+            self._acciones[nombre].append(segundos)
+
+    @contextmanager
+    def medir_accion(self, nombre):
+        #Mide el tiempo total de una acción del menú (carga de departamento, etc.)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_accion(nombre, time.perf_counter() - inicio)
+
+    def resumen(self):
+        with self._lock:
+            resumen = {
+                "duracion_sesion": time.time() - self.inicio,
+                "endpoints": {nombre: m.resumen() for nombre, m in sorted(self._endpoints.items())},
+                "acciones": {
+                    nombre: {
+                        "veces": len(tiempos),
+                        "tiempo_medio": sum(tiempos) / len(tiempos),
+                        "tiempo_max": max(tiempos),
+                        "ultimo": tiempos[-1],
+                    }
+                    for nombre, tiempos in sorted(self._acciones.items())
+                },
+            }
+        if self.cache is not None:
+            resumen["cache"] = self.cache.estadisticas()
+        if self.vuelos is not None:
+            resumen["solicitudes_coalescidas"] = self.vuelos.coalescidas
+        if self.limitador is not None:
+            resumen["limitador"] = self.limitador.estado()
+        return resumen
+
+    def exportar_json(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.resumen(), f, ensure_ascii=False, indent=2)
+        return ruta
+
+    def exportar_csv(self, ruta):
+        #Una fila por endpoint y por acción, con las columnas principales
+        resumen = self.resumen()
+        with open(ruta, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["tipo", "nombre", "cantidad", "errores", "reintentos", "bytes",
+                               "media_s", "p50_s", "p95_s", "max_s", "espera_limitador_media_s"])
+            for nombre, m in resumen["endpoints"].items():
+                escritor.writerow(["endpoint", nombre, m["solicitudes"], m["errores"],
+                                   m["reintentos"], m["bytes"], f"{m['latencia_media']:.4f}",
+                                   f"{m['latencia_p50']:.4f}", f"{m['latencia_p95']:.4f}",
+                                   f"{m['latencia_max']:.4f}", f"{m['espera_limitador_media']:.4f}"])
+            for nombre, a in resumen["acciones"].items():
+                escritor.writerow(["accion", nombre, a["veces"], "", "", "",
+                                   f"{a['tiempo_medio']:.4f}", "", "", f"{a['tiempo_max']:.4f}"])
+        return ruta
@@ -1,6 +1,15 @@
+from array import array
+from sys import intern
+
+
 class Obra:
     """ Representa una obra de arte."""
 
+    __slots__ = ("id", "titulo", "artista", "nacionalidad")
+
+    #Campos del JSON de la API que usa from_json
+    CAMPOS_JSON = ("objectID", "title", "artistDisplayName", "artistNationality")
+
     def __init__(self, object_id, titulo, artista, nacionalidad):
         self.id = object_id
         self.titulo = titulo
@@ -20,8 +29,17 @@ class Obra:
 class DetalleObra:
     """Representa los detalles completos de una obra del museo."""
 
+    __slots__ = ("id", "titulo", "artista", "nacionalidad", "nacimiento",
+                 "muerte", "clasificacion", "anio_creacion", "url_imagen",
+                 "url_imagen_small")
+
+    CAMPOS_JSON = ("objectID", "title", "artistDisplayName", "artistNationality",
+                   "artistBeginDate", "artistEndDate", "classification", "objectDate",
+                   "primaryImage", "primaryImageSmall")
+
     def __init__(self, object_id, titulo, artista, nacionalidad,
-                 nacimiento, muerte, clasificacion, anio_creacion, url_imagen):
+                 nacimiento, muerte, clasificacion, anio_creacion, url_imagen,
+                 url_imagen_small=""):
         self.id = object_id
         self.titulo = titulo
         self.artista = artista
@@ -31,6 +49,7 @@ class DetalleObra:
         self.clasificacion = clasificacion
         self.anio_creacion = anio_creacion
         self.url_imagen = url_imagen
+        self.url_imagen_small = url_imagen_small
 
     @staticmethod
     def from_json(data):
@@ -52,6 +71,83 @@ class DetalleObra:
             get(data, "artistEndDate", "N/D"),
             get(data, "classification", "N/D"),
             get(data, "objectDate", "N/D"),
-            url_img
+            url_img,
+            get(data, "primaryImageSmall", "")
         )
 
+
+
+#Campos que se conservan de cada respuesta objects/{id}: los de ambos modelos
+#más el departamento, que usan el espejo local y el índice de búsqueda
+CAMPOS_OBJETO = tuple(dict.fromkeys(Obra.CAMPOS_JSON + DetalleObra.CAMPOS_JSON + ("department",)))
+
+
+def proyectar(data, campos):
+    #Retorna un diccionario solo con los campos indicados
+    return {campo: data[campo] for campo in campos if campo in data}
+
+
+class _Diccionario:
+    #Codifica textos repetidos como enteros para guardar cada valor una sola vez
+
+    __slots__ = ("valores", "codigos")
+
+    def __init__(self):
+        self.valores = []
+        self.codigos = {}
+
+    def codificar(self, valor):
+        codigo = self.codigos.get(valor)
+        if codigo is None:
+            codigo = len(self.valores)
+            self.valores.append(intern(valor))
+            self.codigos[valor] = codigo
+        return codigo
+
+
+class TablaObras:
+    """
+    Colección columnar de obras: los IDs se guardan en un array('i') y el
+    artista y la nacionalidad como códigos de diccionario. Los objetos Obra
+    solo se crean al acceder a una posición o a una rebanada.
+    """
+
+    def __init__(self, obras=()):
+        self.ids = array("i")
+        self.titulos = []
+        self._artistas = _Diccionario()
+        self._nacionalidades = _Diccionario()
+        self._cod_artista = array("i")
+        self._cod_nacionalidad = array("i")
+        for obra in obras:
+            self.agregar(obra.id, obra.titulo, obra.artista, obra.nacionalidad)
+
+    def agregar(self, object_id, titulo, artista, nacionalidad):
+        self.ids.append(int(object_id))
+        self.titulos.append(titulo or "")
+        self._cod_artista.append(self._artistas.codificar(artista or ""))
+        self._cod_nacionalidad.append(self._nacionalidades.codificar(nacionalidad or ""))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _obra(self, i):
+        return Obra(
+            self.ids[i],
+            self.titulos[i],
+            self._artistas.valores[self._cod_artista[i]],
+            self._nacionalidades.valores[self._cod_nacionalidad[i]]
+        )
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return [self._obra(i) for i in range(*posicion.indices(len(self)))]
+        if posicion < 0:
+            posicion += len(self)
+        if not 0 <= posicion < len(self):
+            raise IndexError("posición fuera de la tabla")
+        return self._obra(posicion)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._obra(i)
@@ -0,0 +1,122 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ResultadosPaginados:
+    """
+    Secuencia perezosa de obras dividida en páginas. Solo descarga las obras
+    de la página pedida y precarga la siguiente en segundo plano mientras el
+    usuario lee la actual.
+    """
+
+    def __init__(self, object_ids, cargar_obras, tamano_pagina=10):
+        #cargar_obras(ids, al_llegar=None, cancelar=None) debe retornar
+        #(lista de Obra, cantidad de errores) y llamar a al_llegar(obra)
+        #con cada obra apenas esté disponible
+        self.object_ids = object_ids if isinstance(object_ids, range) else list(object_ids)
+        self.tamano_pagina = tamano_pagina
+        self.errores = 0
+        self._cargar_obras = cargar_obras
+        self._paginas = {}
+        self._parciales = {}
+        self._cancelaciones = {}
+        self._futuros = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @classmethod
+    def desde_lista(cls, obras, tamano_pagina=10):
+        #Crea resultados ya cargados (una lista de Obra o una TablaObras).
+        #Las claves de cada página son posiciones, así que solo se
+        #materializan las obras de la página mostrada.
+        return cls(
+            range(len(obras)),
+            lambda posiciones, **_: (obras[posiciones.start:posiciones.stop], 0),
+            tamano_pagina
+        )
+
+    def __len__(self):
+        return len(self.object_ids)
+
+    @property
+    def total_paginas(self):
+        return max(1, (len(self.object_ids) + self.tamano_pagina - 1) // self.tamano_pagina)
+
+    def _ids_pagina(self, numero):
+        inicio = numero * self.tamano_pagina
+        return self.object_ids[inicio:inicio + self.tamano_pagina]
+
+    def _cargar(self, numero, cancelar):
+        ids = self._ids_pagina(numero)
+        posiciones = {obj_id: i for i, obj_id in enumerate(ids)}
+        parciales = {}
+        with self._lock:
+            self._parciales[numero] = parciales
+
+        def al_llegar(obra):
+            with self._lock:
+                parciales[posiciones.get(obra.id, len(posiciones))] = obra
+
+        fallo = False
+        try:
+            obras, errores = self._cargar_obras(ids, al_llegar=al_llegar, cancelar=cancelar)
+        except Exception:
+            #Si la carga falla, la página termina con las obras que alcanzaron
+            #a llegar y el resto se cuenta como omitido
+            fallo = True
+            with self._lock:
+                obras = [parciales[posicion] for posicion in sorted(parciales)]
+            errores = len(ids) - len(obras)
+        with self._lock:
+            self.errores += errores
+            #Una carga cancelada puede terminar después de que la página se
+            #volvió a pedir: solo limpia el estado si sigue siendo el suyo
+            propia = self._cancelaciones.get(numero) is cancelar
+            if cancelar.is_set():
+                #Página incompleta: se volverá a cargar si se pide de nuevo
+                if propia:
+                    self._futuros.pop(numero, None)
+            else:
+                self._paginas[numero] = obras
+                if fallo and propia:
+                    #Carga fallida: la página ya no queda en curso
+                    self._futuros.pop(numero, None)
+            if self._parciales.get(numero) is parciales:
+                self._parciales.pop(numero)
+            if propia:
+                self._cancelaciones.pop(numero)
+        return obras
+
+    def pagina_parcial(self, numero):
+        #Retorna (obras de la página que ya llegaron, si la página está completa)
+        with self._lock:
+            if numero in self._paginas:
+                return self._paginas[numero], True
+            parciales = self._parciales.get(numero, {})
+            return [parciales[posicion] for posicion in sorted(parciales)], False
+
+    def cancelar(self, numero):
+        #Descarta las descargas de la página que todavía no empezaron
+        with self._lock:
+            evento = self._cancelaciones.get(numero)
+        if evento is not None:
+            evento.set()
+
+    def precargar(self, numero):
+        #Inicia la descarga de una página en segundo plano si aún no está
+        if not 0 <= numero < self.total_paginas:
+            return
+        with self._lock:
+            if numero in self._paginas:
+                return
+            evento = self._cancelaciones.get(numero)
+            #Una página cancelada cuya descarga sigue en curso se vuelve a encolar
+            if numero in self._futuros and not (evento is not None and evento.is_set()):
+                return
+            cancelar = threading.Event()
+            self._cancelaciones[numero] = cancelar
+            self._futuros[numero] = self._executor.submit(self._cargar, numero, cancelar)
+
+    def cerrar(self):
+        #Cancela las precargas pendientes
+        self._executor.shutdown(wait=False, cancel_futures=True)
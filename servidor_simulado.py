@@ -0,0 +1,240 @@
+"""
+Servidor local que imita la API del Met (departments, search, objects y
+objects/{id}) para medir el rendimiento de MetroArtApp sin conexión.
+Los objetos se generan a partir de las respuestas grabadas en
+fixtures/met_api.json, con latencia, errores y respuestas 429 configurables.
+"""
+import argparse
+import copy
+import io
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+RUTA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "met_api.json")
+
+
+def _generar_imagen(tamano_bytes):
+    #JPEG real (si Pillow está disponible) de aproximadamente el tamaño pedido
+    try:
+        from PIL import Image
+    except ImportError:
+        return os.urandom(tamano_bytes)
+    lado = max(16, int((tamano_bytes / 1.5) ** 0.5))
+    imagen = Image.frombytes("RGB", (lado, lado), os.urandom(lado * lado * 3))
+    salida = io.BytesIO()
+    imagen.save(salida, "JPEG", quality=90)
+    return salida.getvalue()
+
+
+class ColeccionSimulada:
+    """Colección sintética de `cantidad` obras generada desde los fixtures."""
+
+    def __init__(self, cantidad=2000, tamano_extra=0, ruta_fixtures=RUTA_FIXTURES):
+        with open(ruta_fixtures, encoding="utf-8") as f:
+            fixtures = json.load(f)
+        self.departamentos = fixtures["departments"]
+        self.plantillas = fixtures["objects"]
+        self.cantidad = cantidad
+        self.tamano_extra = tamano_extra
+        self.url_imagenes = ""
+        #Fecha de modificación de cada obra, para simular objects?metadataDate
+        self.fechas = {
+            obj_id: f"2024-{1 + obj_id % 12:02d}-{1 + obj_id % 28:02d}"
+            for obj_id in range(1, cantidad + 1)
+        }
+
+    def departamento_de(self, obj_id):
+        return self.departamentos[obj_id % len(self.departamentos)]
+
+    def objeto(self, obj_id):
+        if not 1 <= obj_id <= self.cantidad:
+            return None
+        data = copy.deepcopy(self.plantillas[obj_id % len(self.plantillas)])
+        data["objectID"] = obj_id
+        data["department"] = self.departamento_de(obj_id)["displayName"]
+        data["isHighlight"] = obj_id % 10 == 0
+        data["metadataDate"] = f"{self.fechas[obj_id]}T04:52:22.903Z"
+        if data["primaryImage"]:
+            data["primaryImage"] = f"{self.url_imagenes}/images/{obj_id}.jpg"
+            data["primaryImageSmall"] = f"{self.url_imagenes}/images/{obj_id}.jpg"
+        if self.tamano_extra:
+            data["additionalImages"] = [
+                f"{self.url_imagenes}/images/extra/{obj_id}_{i}.jpg"
+                for i in range(self.tamano_extra // 60)
+            ]
+        return data
+
+    def buscar(self, params):
+        ids = range(1, self.cantidad + 1)
+        if "departmentId" in params:
+            dep_id = int(params["departmentId"])
+            ids = [i for i in ids if self.departamento_de(i)["departmentId"] == dep_id]
+        if params.get("isHighlight", "").lower() == "true":
+            ids = [i for i in ids if i % 10 == 0]
+        q = params.get("q", "").lower()
+        if q and q != "art":
+            ids = [
+                i for i in ids
+                if q in self.plantillas[i % len(self.plantillas)]["artistDisplayName"].lower()
+                or q in self.plantillas[i % len(self.plantillas)]["title"].lower()
+            ]
+        ids = list(ids)
+        return {"total": len(ids), "objectIDs": ids or None}
+
+    def listar(self, params):
+        ids = range(1, self.cantidad + 1)
+        if "departmentIds" in params:
+            deps = {int(d) for d in params["departmentIds"].split("|")}
+            ids = [i for i in ids if self.departamento_de(i)["departmentId"] in deps]
+        if "metadataDate" in params:
+            ids = [i for i in ids if self.fechas[i] >= params["metadataDate"][:10]]
+        ids = list(ids)
+        return {"total": len(ids), "objectIDs": ids}
+
+
+class ServidorSimulado:
+    """
+    Servidor HTTP en un hilo aparte. Se usa como context manager:
+
+        with ServidorSimulado(latencia=0.05) as url:
+            app = MetroArtApp(api_url=url)
+    """
+
+    def __init__(self, cantidad=2000, latencia=0.02, variacion=0.01, tasa_error=0.0,
+                 tasa_429=0.0, retry_after=0, tamano_extra=0, tamano_imagen=150_000,
+                 puerto=0, semilla=1, limite_por_segundo=0):
+        self.coleccion = ColeccionSimulada(cantidad, tamano_extra)
+        self.latencia = latencia
+        self.variacion = variacion
+        self.tasa_error = tasa_error
+        self.tasa_429 = tasa_429
+        self.retry_after = retry_after
+        #Si es mayor que 0, las solicitudes que superan ese ritmo reciben 429
+        self.limite_por_segundo = limite_por_segundo
+        self.rechazadas_por_limite = 0
+        self._recientes = deque()
+        self.imagen = _generar_imagen(tamano_imagen)
+        self.solicitudes = 0
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._crear_manejador())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+        self.url = f"http://127.0.0.1:{self._servidor.server_address[1]}"
+        self.coleccion.url_imagenes = self.url
+
+    def _sortear(self):
+        with self._lock:
+            self.solicitudes += 1
+            return self._azar.random(), self._azar.uniform(-self.variacion, self.variacion)
+
+    def _excede_limite(self):
+        #Ventana deslizante de un segundo con las solicitudes aceptadas
+        if not self.limite_por_segundo:
+            return False
+        with self._lock:
+            ahora = time.monotonic()
+            while self._recientes and ahora - self._recientes[0] > 1.0:
+                self._recientes.popleft()
+            if len(self._recientes) >= self.limite_por_segundo:
+                self.rechazadas_por_limite += 1
+                return True
+            self._recientes.append(ahora)
+            return False
+
+    def _crear_manejador(self):
+        simulador = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            #Cabeceras y cuerpo salen en escrituras separadas: sin esto, Nagle y el
+            #ACK diferido del cliente suman ~40ms a cada respuesta
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, estado, cuerpo, tipo="application/json", cabeceras=None):
+                self.send_response(estado)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                for clave, valor in (cabeceras or {}).items():
+                    self.send_header(clave, valor)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def _json(self, estado, datos):
+                self._responder(estado, json.dumps(datos).encode("utf-8"))
+
+            def do_GET(self):
+                azar, variacion = simulador._sortear()
+                if simulador._excede_limite():
+                    return self._responder(429, b'{"message": "Too Many Requests"}')
+                time.sleep(max(0.0, simulador.latencia + variacion))
+                if azar < simulador.tasa_429:
+                    cabeceras = {"Retry-After": str(simulador.retry_after)} if simulador.retry_after else None
+                    return self._responder(429, b'{"message": "Too Many Requests"}', cabeceras=cabeceras)
+                if azar < simulador.tasa_429 + simulador.tasa_error:
+                    return self._json(500, {"message": "Internal Server Error"})
+
+                url = urlparse(self.path)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                partes = [p for p in url.path.split("/") if p]
+                coleccion = simulador.coleccion
+                if partes == ["departments"]:
+                    return self._json(200, {"departments": coleccion.departamentos})
+                if partes == ["search"]:
+                    return self._json(200, coleccion.buscar(params))
+                if partes == ["objects"]:
+                    return self._json(200, coleccion.listar(params))
+                if len(partes) == 2 and partes[0] == "objects" and partes[1].isdigit():
+                    data = coleccion.objeto(int(partes[1]))
+                    if data is None:
+                        return self._json(404, {"message": "ObjectID not found"})
+                    return self._json(200, data)
+                if partes and partes[0] == "images":
+                    return self._responder(200, simulador.imagen, "image/jpeg")
+                return self._json(404, {"message": "Not Found"})
+
+        return Manejador
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self.url
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API del Met simulada para pruebas de rendimiento")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--objetos", type=int, default=2000)
+    parser.add_argument("--latencia", type=float, default=0.02)
+    parser.add_argument("--errores", type=float, default=0.0)
+    parser.add_argument("--tasa-429", type=float, default=0.0)
+    parser.add_argument("--limite", type=int, default=0, help="Solicitudes por segundo antes de responder 429")
+    args = parser.parse_args()
+    servidor = ServidorSimulado(args.objetos, args.latencia, tasa_error=args.errores,
+                                tasa_429=args.tasa_429, puerto=args.puerto,
+                                limite_por_segundo=args.limite)
+    print(f"API simulada en {servidor.url} (Ctrl+C para salir)")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.detener()
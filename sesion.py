@@ -0,0 +1,116 @@
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from limitador import ESTADOS_LIMITE
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+#Códigos HTTP transitorios que vale la pena reintentar
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+#Tiempo máximo de conexión y de lectura (segundos)
+TIMEOUT_POR_DEFECTO = (3.05, 20)
+
+
+def crear_sesion(tamano_pool=16):
+    """
+    Crea una sesión HTTP con un pool de conexiones persistentes (keep-alive)
+    del tamaño indicado. Los reintentos los maneja `solicitar`.
+    """
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool, max_retries=0)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+
+def decodificar_json(contenido):
+    """
+    Decodifica un cuerpo JSON (bytes) con orjson si está instalado, que es
+    varias veces más rápido, o con el módulo json estándar si no.
+    Lanza ValueError si el contenido no es JSON válido.
+    """
+    if orjson is not None:
+        return orjson.loads(contenido)
+    return json.loads(contenido)
+
+
+def _segundos_retry_after(respuesta):
+    #Interpreta la cabecera Retry-After (segundos o fecha HTTP), o None
+    valor = respuesta.headers.get("Retry-After") if respuesta is not None else None
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def calcular_espera(intento, respuesta=None, backoff=0.5, espera_maxima=30.0):
+    """
+    Retorna cuántos segundos esperar antes del siguiente intento: lo que pida
+    el servidor en Retry-After o, si no, un backoff exponencial con jitter.
+    """
+    retry_after = _segundos_retry_after(respuesta)
+    if retry_after is not None:
+        return min(retry_after, espera_maxima)
+    return random.uniform(0, min(espera_maxima, backoff * (2 ** intento)))
+
+
+def solicitar(sesion, url, params=None, timeout=TIMEOUT_POR_DEFECTO, reintentos=4,
+              backoff=0.5, stream=False, al_reintentar=None, limitador=None, al_esperar=None):
+    """
+    Realiza un GET reintentando errores de conexión y respuestas 429/5xx.
+    Si se indica, `al_reintentar(estado)` se llama antes de cada reintento
+    (estado None si no hubo respuesta).
+    Con un `limitador` cada intento espera su turno y le informa el
+    resultado; en ese caso también se reintentan los 403 de límite de tasa
+    y `al_esperar(segundos)` recibe lo que esperó cada intento su turno.
+    Retorna la respuesta exitosa o lanza requests.exceptions.RequestException.
+    """
+    reintentables = ESTADOS_REINTENTABLES | ESTADOS_LIMITE if limitador else ESTADOS_REINTENTABLES
+    for intento in range(reintentos + 1):
+        if limitador:
+            inicio = time.perf_counter()
+            limitador.adquirir()
+            if al_esperar:
+                al_esperar(time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        try:
+            respuesta = sesion.get(url, params=params, timeout=timeout, stream=stream)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if limitador:
+                limitador.registrar(None)
+            if intento == reintentos:
+                raise
+            if al_reintentar:
+                al_reintentar(None)
+            time.sleep(calcular_espera(intento, backoff=backoff))
+            continue
+
+        if limitador:
+            limitador.registrar(respuesta.status_code, time.perf_counter() - inicio,
+                                _segundos_retry_after(respuesta))
+        if respuesta.status_code in reintentables and intento < reintentos:
+            espera = calcular_espera(intento, respuesta, backoff=backoff)
+            respuesta.close()
+            if al_reintentar:
+                al_reintentar(respuesta.status_code)
+            time.sleep(espera)
+            continue
+
+        respuesta.raise_for_status()
+        return respuesta
@@ -0,0 +1,20 @@
+import pytest
+
+from analitica import decada
+
+
+@pytest.mark.parametrize("texto, esperada", [
+    ("1665", 1660),
+    ("ca. 1665–67", 1660),
+    ("1880s", 1880),
+    ("ca. 1880s", 1880),
+    ("1920s–30s", 1920),
+    ("late 19th century", 1800),
+    ("1st century B.C.", -100),
+    ("ca. 500 B.C.", -500),
+    ("Undated", None),
+    ("9999", None),
+    ("", None),
+])
+def test_decada(texto, esperada):
+    assert decada(texto) == esperada
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from concurrencia import VueloUnico
+
+
+def _en_hilos(cantidad, funcion):
+    resultados = [None] * cantidad
+    errores = [None] * cantidad
+
+    def correr(i):
+        try:
+            resultados[i] = funcion()
+        except Exception as error:
+            errores[i] = error
+
+    hilos = [threading.Thread(target=correr, args=(i,)) for i in range(cantidad)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(5)
+    return resultados, errores
+
+
+def _esperar_coalescidas(vuelo, cantidad, limite=5.0):
+    #La primera llamada no termina hasta que las demás se sumaron a ella
+    fin = time.monotonic() + limite
+    while vuelo.coalescidas < cantidad and time.monotonic() < fin:
+        time.sleep(0.005)
+
+
+def test_vuelo_unico_agrupa_llamadas_con_la_misma_clave():
+    vuelo = VueloUnico()
+    llamadas = []
+
+    def pedir():
+        llamadas.append(1)
+        _esperar_coalescidas(vuelo, 7)
+        return {"objectIDs": [1, 2, 3]}
+
+    resultados, errores = _en_hilos(8, lambda: vuelo.ejecutar("search?q=Gogh", pedir))
+
+    assert len(llamadas) == 1
+    assert vuelo.coalescidas == 7
+    assert errores == [None] * 8
+    assert all(resultado is resultados[0] for resultado in resultados)
+
+
+def test_vuelo_unico_comparte_la_excepcion_y_libera_la_clave():
+    vuelo = VueloUnico()
+
+    def fallar():
+        _esperar_coalescidas(vuelo, 3)
+        raise ConnectionError("sin red")
+
+    _, errores = _en_hilos(4, lambda: vuelo.ejecutar("objects/1", fallar))
+    assert all(isinstance(error, ConnectionError) for error in errores)
+
+    #Terminado el vuelo, la misma clave se vuelve a ejecutar
+    assert vuelo.ejecutar("objects/1", lambda: "de nuevo") == "de nuevo"
+    with pytest.raises(ValueError):
+        vuelo.ejecutar("objects/2", lambda: int("x"))
@@ -0,0 +1,54 @@
+import pytest
+
+from indice import IndiceObras, IndiceNacionalidades
+
+
+@pytest.mark.parametrize("texto, esperadas", [
+    ("French", ["French"]),
+    ("French, born Germany", ["French"]),
+    ("American and British", ["American", "British"]),
+    ("Papua New Guinean, born Australia", ["Papua New Guinean"]),
+    ("Native American", ["Native American"]),
+    ("American|French", ["American", "French"]),
+    ("Frenchy", ["Frenchy"]),
+    ("", []),
+])
+def test_canonizar(texto, esperadas):
+    assert IndiceNacionalidades(ruta=None).canonizar(texto) == esperadas
+
+
+@pytest.fixture
+def indice():
+    indice = IndiceObras(ruta=None)
+    indice.registrar_varios([
+        {"objectID": 1, "title": "Wheat Field with Cypresses", "artistDisplayName": "Vincent van Gogh",
+         "artistNationality": "Dutch", "department": "European Paintings", "classification": "Paintings"},
+        {"objectID": 2, "title": "Self-Portrait with a Straw Hat", "artistDisplayName": "Vincent van Gogh",
+         "artistNationality": "Dutch", "department": "European Paintings", "classification": "Paintings"},
+        {"objectID": 3, "title": "Juan de Pareja", "artistDisplayName": "Diego Velázquez",
+         "artistNationality": "Spanish", "department": "European Paintings", "classification": "Paintings"},
+        {"objectID": 4, "title": "The Great Wave", "artistDisplayName": "Katsushika Hokusai",
+         "artistNationality": "Japanese", "department": "Asian Art", "classification": "Prints"},
+    ])
+    return indice
+
+
+@pytest.mark.parametrize("texto, campo, esperados", [
+    ("gogh", "artista", [1, 2]),
+    ("vinc", "artista", [1, 2]),
+    ("velazquez", "artista", [3]),
+    ("vincent straw", None, [2]),
+    ("van gogh cypress", None, [1]),
+    ("paint", None, [1, 2, 3]),
+    ("wave", "artista", []),
+    ("gogh hokusai", None, []),
+    ("", None, []),
+])
+def test_buscar_por_prefijo_e_interseccion(indice, texto, campo, esperados):
+    assert indice.buscar(texto, campo) == esperados
+
+
+def test_buscar_ve_los_cambios_de_una_obra(indice):
+    indice.registrar_varios([{"objectID": 4, "title": "Red Fuji", "artistDisplayName": "Katsushika Hokusai"}])
+    assert indice.buscar("wave") == []
+    assert indice.buscar("fuji hokusai") == [4]
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from obra import Obra
+from paginacion import ResultadosPaginados
+
+
+def _esperar_completa(resultados, numero, limite=5.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        obras, completa = resultados.pagina_parcial(numero)
+        if completa:
+            return obras
+        time.sleep(0.01)
+    raise AssertionError(f"la página {numero} no terminó de cargar")
+
+
+def test_pagina_cancelada_se_recarga_aunque_la_carga_vieja_termine_tarde():
+    cancelaciones = []
+    empezadas = [threading.Event(), threading.Event()]
+    liberar = [threading.Event(), threading.Event()]
+
+    def cargar(ids, al_llegar=None, cancelar=None):
+        numero = len(cancelaciones)
+        cancelaciones.append(cancelar)
+        empezadas[numero].set()
+        liberar[numero].wait(5)
+        obras = [Obra(obj_id, f"Obra {obj_id}", "Artista", "Dutch") for obj_id in ids]
+        #Una carga cancelada solo alcanza a traer parte de la página
+        return (obras[:1] if cancelar.is_set() else obras), 0
+
+    resultados = ResultadosPaginados(list(range(1, 26)), cargar)
+    try:
+        resultados.precargar(0)
+        assert empezadas[0].wait(5)
+        resultados.cancelar(0)
+        resultados.precargar(0)
+
+        #La carga cancelada termina mientras la nueva está pendiente
+        liberar[0].set()
+        assert empezadas[1].wait(5)
+        assert resultados.pagina_parcial(0)[1] is False
+
+        liberar[1].set()
+        obras = _esperar_completa(resultados, 0)
+        assert [obra.id for obra in obras] == list(range(1, 11))
+        assert cancelaciones[0].is_set() and not cancelaciones[1].is_set()
+        assert resultados.errores == 0
+    finally:
+        for evento in liberar:
+            evento.set()
+        resultados.cerrar()
+
+
+def test_pagina_termina_si_la_carga_falla():
+    def cargar(ids, al_llegar=None, cancelar=None):
+        al_llegar(Obra(ids[0], "Obra", "Artista", "Dutch"))
+        raise ConnectionError("sin red")
+
+    resultados = ResultadosPaginados(list(range(1, 26)), cargar)
+    try:
+        resultados.precargar(0)
+        obras = _esperar_completa(resultados, 0)
+        assert [obra.id for obra in obras] == [1]
+        assert resultados.errores == 9
+    finally:
+        resultados.cerrar()